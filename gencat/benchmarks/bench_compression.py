@@ -0,0 +1,73 @@
+#! /usr/bin/env python
+'''
+Compare the compressions available to gencat.zipFiles on a synthetic corpus.
+
+Usage:
+    python bench_compression.py [--files N] [--size BYTES] [--repeat N]
+
+The corpus consists of --files text files of --size bytes of tab-delimited
+numbers, which are concatenated into a single .zip file. For each compression
+the best wall time of zipFiles over --repeat runs and the size of the .zip
+file are reported.
+'''
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from gencat import gencat
+from corpus import makeTextFiles
+
+COMPRESSIONS = ['stored', 'deflate:1', 'deflate:3', 'deflate:6', 'deflate:9']
+
+
+class BenchCat(gencat):
+    def makeConcatDict(self):
+        pass
+
+    def makeZipDict(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark gencat output compressions.')
+    parser.add_argument('--files', type = int, default = 20)
+    parser.add_argument('--size', type = int, default = 2000000)
+    parser.add_argument('--repeat', type = int, default = 3)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        path_in  = os.path.join(root, 'in')
+        path_out = os.path.join(root, 'out')
+        os.makedirs(path_in)
+        os.makedirs(path_out)
+
+        cat = BenchCat(path_in, os.path.join(root, 'temp'), path_out)
+        cat.concat_dict = {'concat': tuple(makeTextFiles(path_in, args.files, args.size))}
+        cat.zip_dict    = {'bench': ('concat', )}
+        outzippath      = os.path.join(path_out, 'bench.zip')
+        raw_size        = sum(os.path.getsize(f) for f in cat.concat_dict['concat'])
+
+        print 'Corpus: %d files, %.1f MB' % (args.files, raw_size / 1e6)
+        print '%-12s %10s %10s %8s' % ('compression', 'seconds', 'MB', 'ratio')
+        for compression in COMPRESSIONS:
+            times = []
+            for _ in range(args.repeat):
+                if os.path.isfile(outzippath):
+                    os.remove(outzippath)
+                start = time.time()
+                cat.zipFiles(compression = compression)
+                times.append(time.time() - start)
+            size = os.path.getsize(outzippath)
+            print '%-12s %10.3f %10.1f %8.2f' % (compression, min(times), size / 1e6,
+                                                 float(raw_size) / size)
+    finally:
+        shutil.rmtree(root, ignore_errors = True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#! /usr/bin/env python
+'''
+Measure the throughput of each phase of gencat.main on a synthetic corpus.
+
+Usage:
+    python bench_gencat.py [--zips N] [--members N] [--size BYTES] [--sigma S]
+                           [--per-concat N] [--workers N] [--compression C]
+                           [--no-extract] [--keep DIR]
+
+The corpus consists of --zips input .zip files of --members text files apiece,
+with sizes drawn from a lognormal distribution with median --size and shape
+--sigma. Every --per-concat members of an input .zip file are concatenated into
+one file, and each input .zip file yields one output .zip file.
+
+For each phase of main the wall time, the peak resident set size of the
+benchmark and its worker processes so far, and the bytes written to path_temp
+and path_out are reported. With --no-extract the members are read directly
+from the input .zip files and unzipFiles is skipped.
+'''
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from gencat import gencat, extractPath
+from corpus import makeCorpus
+
+
+class BenchCat(gencat):
+
+    def __init__(self, path_in, path_temp, path_out, per_concat, extract):
+        gencat.__init__(self, path_in, path_temp, path_out)
+        self.per_concat = per_concat
+        self.extract = extract
+
+    def makeConcatDict(self):
+        self.concat_dict = {}
+        self.sources = {}
+        for member in self.listZipMembers():
+            zip_key = os.path.basename(member.archive)[:-len('.zip')]
+            if self.extract:
+                member = extractPath(self.path_temp, member.name)
+            self.sources.setdefault(zip_key, []).append(member)
+        for zip_key, members in self.sources.items():
+            for start in range(0, len(members), self.per_concat):
+                concat_key = '%s_concat%s' % (zip_key, start // self.per_concat)
+                self.concat_dict[concat_key] = tuple(members[start:start + self.per_concat])
+
+    def makeZipDict(self):
+        self.zip_dict = {}
+        for concat_key in sorted(self.concat_dict):
+            zip_key = concat_key.rsplit('_', 1)[0]
+            self.zip_dict[zip_key] = self.zip_dict.get(zip_key, ()) + (concat_key, )
+
+
+def peakRSS():
+    '''
+    Return the peak resident set size in MB of this process and of its largest
+    finished child process, or None if it cannot be measured.
+    '''
+    if resource is None:
+        return None
+    # ru_maxrss is in bytes on OS X and kilobytes elsewhere
+    scale = 1e6 if sys.platform == 'darwin' else 1e3
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / scale
+
+
+def bytesIn(*paths):
+    total = 0
+    for path in paths:
+        for root, dirs, files in os.walk(path):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark the phases of gencat.main.')
+    parser.add_argument('--zips', type = int, default = 10)
+    parser.add_argument('--members', type = int, default = 100)
+    parser.add_argument('--size', type = int, default = 100000)
+    parser.add_argument('--sigma', type = float, default = 1.0)
+    parser.add_argument('--per-concat', type = int, default = 10)
+    parser.add_argument('--workers', type = int, default = 1)
+    parser.add_argument('--compression', default = 'deflate')
+    parser.add_argument('--no-extract', dest = 'extract', action = 'store_false')
+    parser.add_argument('--keep', help = 'Directory in which to keep the corpus and output')
+    args = parser.parse_args()
+
+    root = args.keep or tempfile.mkdtemp()
+    try:
+        path_in   = os.path.join(root, 'in')
+        path_temp = os.path.join(root, 'temp')
+        path_out  = os.path.join(root, 'out')
+        if not os.path.isdir(path_in):
+            os.makedirs(path_in)
+        if not os.listdir(path_in):
+            total = makeCorpus(path_in, args.zips, args.members, args.size, args.sigma)
+        else:
+            total = None
+        print 'Corpus: %s' % (path_in)
+        print '%d zips, %d members each, %s MB uncompressed, %s MB compressed' % \
+              (args.zips, args.members, '%.1f' % (total / 1e6) if total else '?',
+               '%.1f' % (bytesIn(path_in) / 1e6))
+
+        cat = BenchCat(path_in, path_temp, path_out, args.per_concat, args.extract)
+        phases = [('cleanDir',   lambda: (cat.cleanDir(cat.path_temp), cat.cleanDir(cat.path_out))),
+                  ('unzipFiles', lambda: cat.unzipFiles(workers = args.workers) if args.extract else None),
+                  ('makeDicts',  lambda: (cat.makeConcatDict(), cat.makeZipDict(), cat.checkDicts())),
+                  ('writeDict',  lambda: (cat.writeDict(cat.concat_dict, 'concatDict.txt', cat.path_temp),
+                                          cat.writeDict(cat.zip_dict, 'zipDict.txt', '.'))),
+                  ('zipFiles',   lambda: cat.writeIndex(cat.zipFiles(workers = args.workers,
+                                                                     compression = args.compression)))]
+
+        print '%-12s %10s %10s %12s %10s' % ('phase', 'seconds', 'MB/s', 'written MB', 'peak MB')
+        for name, phase in phases:
+            written = bytesIn(path_temp, path_out)
+            start = time.time()
+            phase()
+            seconds = time.time() - start
+            written = bytesIn(path_temp, path_out) - written
+            peak = peakRSS()
+            print '%-12s %10.3f %10s %12.1f %10s' % \
+                  (name, seconds, '%.1f' % (written / 1e6 / seconds) if written > 0 and seconds else '-',
+                   max(written, 0) / 1e6, '%.1f' % peak if peak else 'n/a')
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors = True)
+
+
+if __name__ == '__main__':
+    main()
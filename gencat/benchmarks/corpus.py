@@ -0,0 +1,72 @@
+'''
+Synthetic corpora for the gencat benchmarks.
+
+Corpus files hold rows of tab-delimited numbers, which compress roughly as
+well as the census extracts gencat is used on.
+'''
+import math
+import os
+import random
+import zipfile
+from cStringIO import StringIO
+
+
+def writeTextFile(f, size, rng):
+    '''
+    Write about size bytes of rows of tab-delimited numbers to the open file f.
+    '''
+    written = 0
+    rows = []
+    while written < size:
+        row = '%d\t%.4f\t%.4f\t%d\n' % (rng.randint(0, 99999), rng.gauss(0, 1),
+                                        rng.random() * 1000, rng.randint(0, 1))
+        rows.append(row)
+        written += len(row)
+        if len(rows) == 1000:
+            f.write(''.join(rows))
+            rows = []
+    f.write(''.join(rows))
+
+
+def memberSizes(members, size, sigma, rng):
+    '''
+    Return members sizes drawn from a lognormal distribution with median size and shape
+    sigma. All sizes equal size when sigma is zero.
+    '''
+    return [int(size * math.exp(rng.gauss(0, sigma))) if sigma else size
+            for _ in range(members)]
+
+
+def makeCorpus(path_in, zips, members, size, sigma = 0, seed = 0):
+    '''
+    Write zips .zip files of members text files apiece to path_in, with member sizes as
+    given by memberSizes. Members of the n-th zip are named zip<n>/member<m>.txt.
+    Returns the total uncompressed size of the corpus in bytes.
+    '''
+    rng = random.Random(seed)
+    total = 0
+    for n in range(zips):
+        zippath = os.path.join(path_in, 'zip%s.zip' % n)
+        with zipfile.ZipFile(zippath, 'w', zipfile.ZIP_DEFLATED, True) as zf:
+            for m, member_size in enumerate(memberSizes(members, size, sigma, rng)):
+                f = StringIO()
+                writeTextFile(f, member_size, rng)
+                total += f.tell()
+                zf.writestr('zip%s/member%s.txt' % (n, m), f.getvalue())
+
+    return total
+
+
+def makeTextFiles(path, files, size, seed = 0):
+    '''
+    Write files text files of about size bytes to path and return their paths.
+    '''
+    rng = random.Random(seed)
+    paths = []
+    for n in range(files):
+        filepath = os.path.join(path, 'file%s.txt' % n)
+        with open(filepath, 'wb') as f:
+            writeTextFile(f, size, rng)
+        paths.append(filepath)
+
+    return paths
@@ -1,9 +1,32 @@
 #!/usr/bin/env python
 import os
+import time
+import struct
+import hashlib
 import shutil
 import zipfile
 import zlib
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 from abc import ABCMeta, abstractmethod
+from collections import namedtuple
+
+# Number of characters read from a source file at a time when concatenating
+CHUNK_SIZE = 1024 * 1024
+
+# Size of the buffer used to write dictionaries
+WRITE_BUFFER = 1024 * 1024
+
+# Minimum number of members of an archive given to each task of unzipFiles's pool
+EXTRACT_BATCH = 256
+
+# Compression methods available for output .zip files. 'deflate' may be followed by a
+# compression level, e.g. 'deflate:1' for the fastest compression.
+COMPRESSION = {'stored': zipfile.ZIP_STORED, 'deflate': zipfile.ZIP_DEFLATED}
+
+# A file stored in one of the .zip files in path_in, which may be used in place of a 
+# path to an extracted file in the values of concat_dict
+ZipMember = namedtuple('ZipMember', ['archive', 'name'])
 
 class gencat(object):
     '''
@@ -20,6 +43,11 @@ class gencat(object):
             by the class's main method.
         - path_out: the path to the directory to which a gencat object will save
             its final output. 
+    
+    The values of concat_dict may either be paths to files extracted to path_temp
+    or ZipMember(archive, name) tuples referring to files stored in the .zip files
+    in path_in. The latter are read directly from their archives, which allows the
+    extraction step to be skipped with main(extract = False).
     '''
 
     __metaclass__ = ABCMeta
@@ -32,20 +60,60 @@ class gencat(object):
         self.zip_dict = {}
 
     
-    def main(self):
+    def main(self, extract = True, workers = 1, incremental = False, compression = 'deflate'):
         '''
         Run all methods in order to produce fresh output. 
         Begins by wiping the path_temp and path_out directories.
+        If extract is False, the .zip files in path_in are not extracted and
+        makeConcatDict should refer to their contents with ZipMember tuples.
+        workers is the number of threads used to extract the input .zip files and
+        the number of processes used to build the output .zip files.
+        If incremental is True, path_out is kept and only the .zip files whose
+        inputs differ from those recorded in its zipManifest.txt are rebuilt.
+        Signatures are only computed and recorded by incremental runs, so a first
+        incremental run after a full one rebuilds every .zip file.
+        compression is passed to zipFiles.
+        The location of each original file in the output is written to concatIndex.txt,
+        which catReader uses to read original files back.
         '''
         self.cleanDir(self.path_temp)
-        self.cleanDir(self.path_out)
-        self.unzipFiles()
+        if not incremental:
+            self.cleanDir(self.path_out)
+        elif not os.path.isdir(self.path_out):
+            os.makedirs(self.path_out)
+        if extract:
+            self.unzipFiles(workers = workers)
         self.makeConcatDict()
         self.makeZipDict()
         self.checkDicts()
         self.writeDict(self.concat_dict, 'concatDict.txt', self.path_temp)
         self.writeDict(self.zip_dict, 'zipDict.txt', '.')
-        self.zipFiles()
+        
+        if incremental:
+            signatures = self.zipSignatures(compression)
+            manifest = self.readManifest()
+            stale    = [zip_key for zip_key in manifest if zip_key not in self.zip_dict]
+            zip_keys = [zip_key for zip_key in self.zip_dict 
+                        if manifest.get(zip_key) != signatures[zip_key] or 
+                           not os.path.isfile(os.path.join(self.path_out, zip_key + '.zip'))]
+            # Forget the signatures of the .zip files about to be rebuilt first, so that a zip
+            # left incomplete by a failed run is not mistaken for an up-to-date one
+            self.writeManifest(dict((zip_key, manifest[zip_key]) for zip_key in manifest
+                                    if zip_key in self.zip_dict and zip_key not in zip_keys))
+            for zip_key in stale + zip_keys:
+                outzippath = os.path.join(self.path_out, zip_key + '.zip')
+                if os.path.isfile(outzippath):
+                    os.remove(outzippath)
+            index    = self.zipFiles(workers = workers, zip_keys = zip_keys, compression = compression)
+            previous = readIndex(self.path_out)
+            for zip_key in self.zip_dict:
+                if zip_key not in index:
+                    index[zip_key] = previous.get(zip_key, [])
+        else:
+            index = self.zipFiles(workers = workers, compression = compression)
+        self.writeIndex(index)
+        if incremental:
+            self.writeManifest(signatures)
         self.cleanDir(self.path_temp, new_dir = False)
     
 
@@ -59,18 +127,110 @@ class gencat(object):
             if new_dir != False:
                 os.makedirs(path)
     
-    def unzipFiles(self):
+    def unzipFiles(self, workers = 1, pool = 'thread', progress = None):
+        '''
+        Unzips files from path_in to path_temp.
+        
+        Archives are extracted one after another, each opened once, so that where several
+        archives contain the same file, the copy from the archive listed last by os.listdir
+        is kept. If workers is greater than one, members are instead extracted concurrently 
+        by a pool of that many threads or, if pool is 'process', processes, following 
+        planExtraction, with the same result. If given, progress is called with the archive
+        path and member name of each file once it has been extracted.
+        '''
+        if pool not in ['thread', 'process']:
+            raise ValueError("pool must be 'thread' or 'process', not %s" % (pool))
+        
+        archives = [os.path.join(self.path_in, infilename) for infilename in os.listdir(self.path_in)]
+        if workers <= 1:
+            for infile in archives:
+                try:
+                    zf = zipfile.ZipFile(infile, 'r')
+                except (zipfile.BadZipfile, IOError):
+                    continue
+                with zf:
+                    for zinfo in zf.infolist():
+                        zf.extract(zinfo, self.path_temp)
+                        if not zinfo.filename.endswith('/'):
+                            reportProgress(progress, infile, [zinfo.filename])
+            return
+        
+        tasks = self.planExtraction(archives, workers)
+        if len(tasks) > 1:
+            if pool == 'process':
+                extract_pool = multiprocessing.Pool(min(workers, len(tasks)))
+            else:
+                extract_pool = ThreadPool(min(workers, len(tasks)))
+            try:
+                for infile, names in extract_pool.imap_unordered(_extractWorker, tasks):
+                    reportProgress(progress, infile, names)
+            finally:
+                extract_pool.close()
+                extract_pool.join()
+        else:
+            for task in tasks:
+                reportProgress(progress, *_extractWorker(task))
+    
+    def planExtraction(self, archives, workers = 1):
         '''
-        Unzips files from path_in to path_temp
+        Create the directories needed to extract the .zip files at the paths in archives to 
+        path_temp and return a list of (archive path, member names, path_temp) extraction tasks.
+        The members of each archive are split into at most workers tasks of every n-th member,
+        with at least EXTRACT_BATCH members in each, since each task opens its archive and 
+        reads its whole central directory. Members that a later archive would overwrite are
+        skipped, as are paths that are not .zip files. Each archive is open only while its
+        members are listed, so that the number of open files does not grow with the number of
+        archives.
         '''
-        infilenames = os.listdir(self.path_in)
+        members = []
+        for infile in archives:
+            try:
+                with zipfile.ZipFile(infile, 'r') as zf:
+                    members.append((infile, [zinfo.filename for zinfo in zf.infolist()]))
+            except (zipfile.BadZipfile, IOError):
+                pass
+        
+        owners = {}
+        dirs   = set()
+        for i, (infile, names) in enumerate(members):
+            for name in names:
+                target = extractPath(self.path_temp, name)
+                if name.endswith('/'):
+                    dirs.add(target)
+                else:
+                    dirs.add(os.path.dirname(target))
+                    owners[target] = i
+        
+        for dirpath in sorted(dirs):
+            if not os.path.isdir(dirpath):
+                os.makedirs(dirpath)
+        
+        tasks = []
+        for i, (infile, names) in enumerate(members):
+            names = [name for name in names if owners.get(extractPath(self.path_temp, name)) == i]
+            parts = max(1, min(workers, len(names) // EXTRACT_BATCH))
+            for start in range(parts):
+                if names[start::parts]:
+                    tasks.append((infile, names[start::parts], self.path_temp))
         
-        for infilename in infilenames:
+        return tasks
+    
+    def listZipMembers(self):
+        '''
+        Return a ZipMember for each file stored in the .zip files in path_in,
+        without extracting them.
+        '''
+        members = []
+        for infilename in sorted(os.listdir(self.path_in)):
             infile = os.path.join(self.path_in, infilename)
         
             if zipfile.is_zipfile(infile):
                 with zipfile.ZipFile(infile, 'r') as zf:
-                    zf.extractall(self.path_temp)
+                    for name in zf.namelist():
+                        if not name.endswith('/'):
+                            members.append(ZipMember(infile, name))
+        
+        return members
     
     @abstractmethod
     def makeConcatDict(self):
@@ -91,64 +251,498 @@ class gencat(object):
     def checkDicts(self):
         '''
         Raises an exception if ZipDict or ConcatDict is empty or has non-tuple values.
+        All keys with non-tuple values are reported at once.
         '''
-        for d in [self.concat_dict, self.zip_dict]:
+        for name, d in [('concat_dict', self.concat_dict), ('zip_dict', self.zip_dict)]:
+            if not isinstance(d, dict):
+                raise TypeError('%s must be a dictionary, not %s' % (name, type(d).__name__))
             if not d:
-                raise Exception('THe dictionary %s must be non-empty' % (d))
-            else:
-                for key in d:
-                    if not type(d[key]) is tuple:
-                        raise TypeError('All keys in dictionary %s must be tuples. Check key %s, and try again.' % (d, key))
+                raise Exception('The dictionary %s must be non-empty' % (name))
+            
+            invalid = [key for key, val in d.iteritems() if type(val) is not tuple]
+            if invalid:
+                raise TypeError('All values in dictionary %s must be tuples. Check the %d key(s) %s, and try again.' % 
+                                (name, len(invalid), ', '.join(sorted(str(key) for key in invalid))))
     
     
     def writeDict(self, dict, name, rel_path):
         '''
         Write the dictionary to output as a |-delimited text file. The elements of each tuple are
-        shortened to their filenames for writing only.
+        shortened to their filenames for writing only. ZipMember elements are written as the
+        member name appended to the path of its archive relative to path_in.
+        Relative paths are computed once per distinct directory rather than once per element.
         '''
         outfile_path = os.path.join(self.path_out, name)
-        with open(outfile_path, 'wb') as outfile:
-            
-            for key in sorted(dict.keys()):
-                outfile.write(key)
-                
-                for val in dict[key]:
-                    write = os.path.relpath(val, rel_path)
-                    outfile.write('|' + write)
-                
-                outfile.write('\n')
+        relpaths = {}
+        
+        def shorten(val):
+            if isinstance(val, ZipMember):
+                return os.path.join(relPath(val.archive, self.path_in, relpaths), val.name)
+            return relPath(val, rel_path, relpaths)
+        
+        with open(outfile_path, 'wb', WRITE_BUFFER) as outfile:
+            outfile.writelines('|'.join([key] + [shorten(val) for val in dict[key]]) + '\n'
+                               for key in sorted(dict.keys()))
+    
+    
+    def zipSignatures(self, compression = 'deflate'):
+        '''
+        Return a dictionary mapping each key of zip_dict to a hash of everything its .zip file is
+        built from: its compression, the names of its concatenated files and the names and 
+        contents of their sources. File contents are hashed with SHA-1, while ZipMember contents are identified 
+        by the CRC and size stored in their archive, so that archives need not be decompressed.
+        '''
+        digests  = {}
+        archives = {}
+        try:
+            signatures = {}
+            for zip_key in self.zip_dict:
+                signature = hashlib.sha1()
+                signature.update('%s\n' % (compressionFor(compression, zip_key), ))
+                for zip_val in self.zip_dict[zip_key]:
+                    signature.update('%s\n' % (zip_val))
+                    for concat_val in self.concat_dict[zip_val]:
+                        if concat_val not in digests:
+                            digests[concat_val] = sourceDigest(concat_val, archives)
+                        signature.update('%s|%s\n' % (concat_val, digests[concat_val]))
+                signatures[zip_key] = signature.hexdigest()
+        finally:
+            for archive in archives.values():
+                archive.close()
+        
+        return signatures
+    
+    
+    def readManifest(self):
+        '''
+        Return the signatures recorded in path_out by writeManifest, or an empty dictionary
+        if none were recorded.
+        '''
+        manifest = {}
+        manifest_path = os.path.join(self.path_out, 'zipManifest.txt')
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, 'rU') as infile:
+                for line in infile:
+                    zip_key, signature = line.rstrip('\n').rsplit('|', 1)
+                    manifest[zip_key] = signature
+        
+        return manifest
+    
+    
+    def writeManifest(self, signatures):
+        '''
+        Record the signature of each output .zip file in path_out as a |-delimited text file.
+        '''
+        with open(os.path.join(self.path_out, 'zipManifest.txt'), 'wb') as outfile:
+            for zip_key in sorted(signatures.keys()):
+                outfile.write('%s|%s\n' % (zip_key, signatures[zip_key]))
+    
+    
+    def writeIndex(self, index):
+        '''
+        Write the index returned by zipFiles to path_out as a |-delimited text file with one
+        line per original file: its filename, .zip file, entry, and the offset and length of 
+        its content within the uncompressed entry.
+        '''
+        with open(os.path.join(self.path_out, 'concatIndex.txt'), 'wb') as outfile:
+            for zip_key in sorted(index.keys()):
+                for row in index[zip_key]:
+                    outfile.write('%s|%s|%s|%d|%d\n' % row)
     
     
-    def zipFiles(self):
+    def zipFiles(self, workers = 1, zip_keys = None, compression = 'deflate'):
         '''
         Concatenates all files in a dictionary values to a new file named for the corresponding key.
         Files are concatenated in the order in which they appear in the dictionary value. 
         Places NEWFILE\nFILENAME: <original filename> before each new file in the concatenation.
         Stores all concatenated files to .zip file(s) with ZIP64 compression in path_out.
+        Concatenated files are streamed directly into their zip entries, so no intermediate
+        copy is written to disk.
+        
+        If workers is greater than one, distinct .zip files are built concurrently by a pool of 
+        that many processes. All entries share one timestamp, so the output does not depend on 
+        the number of workers. If zip_keys is given, only the .zip files for those keys are built.
+        
+        compression is either the compression of every .zip file or a dictionary mapping keys
+        of zip_dict to compressions, where keys that are not in the dictionary use 'deflate'.
+        A compression is 'stored', 'deflate' or 'deflate:<level>' with a level from 0 to 9.
+        
+        Returns a dictionary mapping each key built to the rows of its index, which are
+        (filename, .zip file, entry, offset, length) tuples locating each original file.
         '''
-        for zip_key in self.zip_dict.keys():
-            catdirpath = os.path.join(self.path_temp, zip_key, '')
-            os.makedirs(catdirpath)
-            inzippath = os.path.join('..', zip_key, '')
-            self.cleanDir(inzippath)
-
-            outzipname = zip_key + '.zip'
-            outzippath = os.path.join(self.path_out, outzipname)
-            zf         = zipfile.ZipFile(outzippath, 'a', zipfile.ZIP_DEFLATED, True)
+        date_time = time.localtime(time.time())[0:6]
+        if zip_keys is None:
+            zip_keys = self.zip_dict.keys()
+        tasks = [(zip_key, date_time, compressionFor(compression, zip_key)) 
+                 for zip_key in sorted(zip_keys)]
+        for task in tasks:
+            parseCompression(task[2])
+        
+        if workers > 1 and len(tasks) > 1:
+            pool = multiprocessing.Pool(min(workers, len(tasks)), _initWorker, (self, ))
+            try:
+                indices = pool.map(_zipWorker, tasks, 1)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            indices = [self.writeZip(*task) for task in tasks]
+        
+        return dict((task[0], rows) for task, rows in zip(tasks, indices))
+    
+    
+    def writeZip(self, zip_key, date_time, compression = 'deflate'):
+        '''
+        Write the concatenated files in zip_dict[zip_key] to <zip_key>.zip in path_out,
+        timestamping each entry with date_time and compressing it as given by compression.
+        Returns the rows of the .zip file's index.
+        '''
+        compress_type, level = parseCompression(compression)
+        outzipname = zip_key + '.zip'
+        outzippath = os.path.join(self.path_out, outzipname)
+        archives   = {}
+        rows       = []
+        
+        try:
+            with zipfile.ZipFile(outzippath, 'a', compress_type, True) as zf:
+                for zip_val in self.zip_dict[zip_key]:
+                    catfilename = zip_val + '.txt'
+                    arcname = os.path.normpath(os.path.join('..', zip_key, catfilename))
+                    index   = []
+                    zinfo   = writeStream(zf, arcname, self.concatChunks(zip_val, archives, index),
+                                          date_time, level)
+                    rows.extend((filename, outzipname, zinfo.filename, offset, length)
+                                for filename, offset, length in index)
+        finally:
+            for archive in archives.values():
+                archive.close()
+        
+        return rows
+    
+    
+    def concatChunks(self, concat_key, archives, index = None):
+        '''
+        Yield the concatenation of the files in concat_dict[concat_key] in chunks of at most 
+        CHUNK_SIZE characters, each file preceded by its NEWFILE\nFILENAME: header.
+        Source archives of ZipMember values are opened once and kept in archives, a 
+        dictionary keyed by archive path that the caller is responsible for closing.
+        If index is a list, a (filename, offset, length) tuple locating the content of each 
+        file in the concatenation is appended to it.
+        '''
+        position = 0
+        for concat_val in self.concat_dict[concat_key]:
+            if isinstance(concat_val, ZipMember):
+                filename = os.path.basename(concat_val.name)
+            else:
+                filename = os.path.basename(concat_val)
+            header = '\nNEWFILE\nFILENAME: %s\n\n' % (filename)
+            yield header
+            position += len(header)
             
-            for zip_val in self.zip_dict[zip_key]:
-                catfilename = zip_val + '.txt'
-                catfilepath = os.path.join(catdirpath, catfilename)
-                with open(catfilepath, 'ab') as catfile:
-                    concat_key = zip_val 
-                    for concat_val in self.concat_dict[concat_key]:
-                        catfile.write('\nNEWFILE\nFILENAME: %s\n\n' % (os.path.basename(concat_val)))
-                        with open(concat_val, 'rU') as f:
-                            for line in f:
-                                catfile.write(line)
-                
-                inzipfile = os.path.join(inzippath, catfilename) 
-                shutil.copyfile(catfilepath, inzipfile)
-                zf.write(inzipfile)
-        
-            self.cleanDir(inzippath, new_dir = False)
+            start = position
+            for chunk in self.sourceChunks(concat_val, archives):
+                position += len(chunk)
+                yield chunk
+            if index is not None:
+                index.append((filename, start, position - start))
+    
+    
+    def sourceChunks(self, concat_val, archives):
+        '''
+        Yield the contents of a value of concat_dict with universal newlines. Sources are read 
+        in binary chunks of at most CHUNK_SIZE bytes and translated by translateNewlines.
+        '''
+        if isinstance(concat_val, ZipMember):
+            if concat_val.archive not in archives:
+                archives[concat_val.archive] = zipfile.ZipFile(concat_val.archive, 'r')
+            f = archives[concat_val.archive].open(concat_val.name, 'r')
+        else:
+            f = open(concat_val, 'rb')
+        
+        with f:
+            for chunk in translateNewlines(iter(lambda: f.read(CHUNK_SIZE), '')):
+                yield chunk
+
+
+class catReader(object):
+    '''
+    Random access to the original files concatenated by gencat
+
+    catReader reads the concatIndex.txt file that gencat.main writes to path_out
+    and returns the content of an original file without scanning the concatenated 
+    files for their NEWFILE separators. Entries stored without compression are read
+    with a single seek, while compressed entries are only decompressed up to the end
+    of the requested file. Its constructor takes the following as arguments:
+        - path_out: the path to the output directory of a gencat object.
+    '''
+    
+    def __init__(self, path_out):
+        self.path_out = os.path.join(path_out, '')
+        self.index = {}
+        for zip_key, rows in sorted(readIndex(self.path_out).items()):
+            for row in rows:
+                self.index.setdefault(row[0], []).append(row[1:])
+        self.zipfiles = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+    
+    def close(self):
+        for zf in self.zipfiles.values():
+            zf.close()
+        self.zipfiles = {}
+    
+    def locate(self, filename):
+        '''
+        Return a list of the (.zip file, entry, offset, length) locations of filename, ordered
+        by .zip file and then by their order in the concatenation.
+        '''
+        return list(self.index.get(filename, []))
+    
+    def read(self, filename, entry = None, occurrence = None):
+        '''
+        Return the content of the original file filename. If files with the same name were
+        concatenated into more than one entry, entry must name the one to read from. If an
+        entry holds more than one file with that name, occurrence must give the position,
+        counting from 0, of the one to read among them.
+        '''
+        locations = [loc for loc in self.locate(filename) if entry is None or loc[1] == entry]
+        if occurrence is not None:
+            locations = locations[occurrence:occurrence + 1] if occurrence >= 0 else []
+        if not locations:
+            raise KeyError('%s is not in the index of %s' % (filename, self.path_out))
+        if len(locations) > 1:
+            entries = sorted(set(loc[1] for loc in locations))
+            if len(entries) > 1:
+                raise ValueError('%s is in more than one entry. Specify one of %s.' % 
+                                 (filename, ', '.join(entries)))
+            raise ValueError('%s occurs %d times in %s. Specify an occurrence from 0 to %d.' % 
+                             (filename, len(locations), entries[0], len(locations) - 1))
+        zipname, entry, offset, length = locations[0]
+        
+        if zipname not in self.zipfiles:
+            self.zipfiles[zipname] = zipfile.ZipFile(os.path.join(self.path_out, zipname), 'r')
+        zf    = self.zipfiles[zipname]
+        zinfo = zf.getinfo(entry)
+        if offset + length > zinfo.file_size:
+            raise ValueError('%s lies beyond the end of %s in %s. Is concatIndex.txt out of date?' % 
+                             (filename, entry, zipname))
+        
+        if zinfo.compress_type == zipfile.ZIP_STORED:
+            zf.fp.seek(zinfo.header_offset)
+            header = zf.fp.read(zipfile.sizeFileHeader)
+            header = struct.unpack(zipfile.structFileHeader, header)
+            start  = zinfo.header_offset + zipfile.sizeFileHeader + \
+                     header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH]
+            zf.fp.seek(start + offset)
+            return zf.fp.read(length)
+        
+        with zf.open(zinfo) as f:
+            while offset > 0:
+                skipped = len(f.read(min(offset, CHUNK_SIZE)))
+                if not skipped:
+                    raise ValueError('Unexpected end of %s in %s while reading %s' % 
+                                     (entry, zipname, filename))
+                offset -= skipped
+            return f.read(length)
+
+
+def readIndex(path_out):
+    '''
+    Return the index written to path_out by gencat.writeIndex as a dictionary mapping keys
+    of zip_dict to the rows of their index, or an empty dictionary if there is no index.
+    '''
+    index = {}
+    index_path = os.path.join(path_out, 'concatIndex.txt')
+    if os.path.isfile(index_path):
+        with open(index_path, 'rU') as infile:
+            for line in infile:
+                filename, zipname, entry, offset, length = line.rstrip('\n').rsplit('|', 4)
+                row = (filename, zipname, entry, int(offset), int(length))
+                index.setdefault(zipname[:-len('.zip')], []).append(row)
+    
+    return index
+
+
+# The gencat object used by the processes of zipFiles's pool
+_worker_cat = None
+
+def _initWorker(cat):
+    global _worker_cat
+    _worker_cat = cat
+
+def _zipWorker(args):
+    return _worker_cat.writeZip(*args)
+
+
+def _extractWorker(args):
+    archive, names, path = args
+    with zipfile.ZipFile(archive, 'r') as zf:
+        for name in names:
+            zf.extract(name, path)
+    return archive, names
+
+
+def extractPath(path, name):
+    '''
+    Return the path to which ZipFile.extract writes the member name when extracting to path.
+    '''
+    arcname = name.replace('/', os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    parts = [x for x in arcname.split(os.path.sep) if x not in ('', os.path.curdir, os.path.pardir)]
+    
+    return os.path.join(path, *parts)
+
+
+def sourceDigest(concat_val, archives):
+    '''
+    Return a string identifying the contents of a value of concat_dict. Archives of ZipMember
+    values are opened once and kept in archives, which the caller is responsible for closing.
+    '''
+    if isinstance(concat_val, ZipMember):
+        if concat_val.archive not in archives:
+            archives[concat_val.archive] = zipfile.ZipFile(concat_val.archive, 'r')
+        zinfo = archives[concat_val.archive].getinfo(concat_val.name)
+        return '%08x:%d' % (zinfo.CRC, zinfo.file_size)
+    
+    digest = hashlib.sha1()
+    with open(concat_val, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), ''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def relPath(path, start, cache):
+    '''
+    Return os.path.relpath(path, start), reusing the relative path of the directory of path
+    if it is stored in cache, a dictionary keyed by (directory, start).
+    '''
+    directory, filename = os.path.split(path)
+    if filename in ['', os.curdir, os.pardir]:
+        return os.path.relpath(path, start)
+    
+    if (directory, start) not in cache:
+        cache[(directory, start)] = os.path.relpath(directory or os.curdir, start)
+    reldir = cache[(directory, start)]
+    
+    return filename if reldir == os.curdir else os.path.join(reldir, filename)
+
+
+def translateNewlines(chunks):
+    '''
+    Yield the strings in chunks with CRLF and CR line endings replaced by LF, as when 
+    reading a file in universal newline mode. A CRLF split between two chunks is 
+    translated to a single LF.
+    '''
+    pending_cr = False
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if pending_cr and chunk.startswith('\n'):
+            # The CR that ended the previous chunk has already been translated
+            chunk = chunk[1:]
+        pending_cr = chunk.endswith('\r')
+        if '\r' in chunk:
+            chunk = chunk.replace('\r\n', '\n').replace('\r', '\n')
+        if chunk:
+            yield chunk
+
+
+def reportProgress(progress, infile, names):
+    if progress is not None:
+        for name in names:
+            progress(infile, name)
+
+
+def compressionFor(compression, zip_key):
+    '''
+    Return the compression of the .zip file for zip_key given zipFiles's compression argument.
+    '''
+    if isinstance(compression, dict):
+        return compression.get(zip_key, 'deflate')
+    return compression
+
+
+def parseCompression(compression):
+    '''
+    Return the ZIP compression method and level given by a compression such as 'deflate:1'.
+    The level is None when the default level of the method should be used.
+    '''
+    method, _, level = compression.partition(':')
+    if method not in COMPRESSION:
+        raise ValueError('Compression %s is not one of %s' % (compression, ', '.join(sorted(COMPRESSION))))
+    if not level:
+        return COMPRESSION[method], None
+    if method != 'deflate' or level not in [str(n) for n in range(10)]:
+        raise ValueError('Compression %s does not have a level from 0 to 9' % (compression))
+    
+    return COMPRESSION[method], int(level)
+
+
+def writeStream(zf, arcname, chunks, date_time = None, level = None):
+    '''
+    Write the strings yielded by chunks to the open ZipFile zf as a single entry named arcname,
+    timestamped with date_time (the current time by default) and compressed with the default
+    compression of zf at the given zlib level (the zlib default by default).
+    
+    This follows ZipFile.write, which only accepts a file on disk: a header is written first,
+    the data is compressed as it arrives, and the header is rewritten once the CRC and sizes
+    are known. Memory use is bounded by the size of the largest chunk. The ZIP64 extra field
+    is always reserved since the final size of the entry is not known in advance. Returns the
+    ZipInfo of the new entry.
+    '''
+    if date_time is None:
+        date_time = time.localtime(time.time())[0:6]
+    zinfo = zipfile.ZipInfo(arcname, date_time)
+    zinfo.external_attr = 0644 << 16L
+    zinfo.compress_type = zf.compression
+    zinfo.file_size = 0
+    zinfo.compress_size = 0
+    zinfo.CRC = 0
+    zinfo.header_offset = zf.fp.tell()
+    
+    zf._writecheck(zinfo)
+    zf._didModify = True
+    zip64 = zf._allowZip64
+    zf.fp.write(zinfo.FileHeader(zip64))
+    
+    if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+        if level is None:
+            level = zlib.Z_DEFAULT_COMPRESSION
+        cmpr = zlib.compressobj(level, zlib.DEFLATED, -15)
+    else:
+        cmpr = None
+    
+    CRC = file_size = compress_size = 0
+    for buf in chunks:
+        file_size += len(buf)
+        CRC = zlib.crc32(buf, CRC) & 0xffffffff
+        if cmpr:
+            buf = cmpr.compress(buf)
+        compress_size += len(buf)
+        zf.fp.write(buf)
+    if cmpr:
+        buf = cmpr.flush()
+        compress_size += len(buf)
+        zf.fp.write(buf)
+    
+    if not zip64 and (file_size > zipfile.ZIP64_LIMIT or compress_size > zipfile.ZIP64_LIMIT):
+        raise zipfile.LargeZipFile('Filesize would require ZIP64 extensions')
+    zinfo.CRC = CRC
+    zinfo.file_size = file_size
+    zinfo.compress_size = compress_size
+    
+    # Seek backwards and rewrite the header with the correct CRC and sizes
+    position = zf.fp.tell()
+    zf.fp.seek(zinfo.header_offset, 0)
+    zf.fp.write(zinfo.FileHeader(zip64))
+    zf.fp.seek(position, 0)
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
+    
+    return zinfo
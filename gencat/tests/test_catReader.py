@@ -0,0 +1,145 @@
+import unittest
+import os
+import shutil
+import zipfile
+import sys
+
+# Ensure that Python can find and load gencat.py
+os.chdir(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append('..')
+
+from gencat import gencat, catReader
+
+
+class MockCat(gencat):
+
+    def makeZipDict(self):
+        self.zip_dict = {'zip1': ('concat1', ), 'zip2': ('concat2', 'concat3')}
+
+    def makeConcatDict(self):
+        self.concat_dict = {'concat1': ('./test_data/file1.txt', './test_data/file2.txt'),
+                            'concat2': ('./test_data/file3.txt', ),
+                            'concat3': ('./test_data/file1.txt', )}
+
+
+class test_catReader(unittest.TestCase):
+
+    def setUp(self):
+        paths = ['./test_data']
+        for path in paths:
+            try:
+                os.makedirs(path)
+            except:
+                shutil.rmtree(path, ignore_errors = True)
+                os.makedirs(path)
+        for count in range(1, 4):
+            with open('./test_data/file%s.txt' % count, 'wb') as f:
+                f.write('THIS IS TEST FILE %s.\r\nIT HAS %s LINES.\n' % (count, count + 1) * count)
+
+    def test_index(self):
+        '''
+        Test that main writes an index locating every original file in the output.
+        '''
+        testcat = MockCat('./test_data', './test_temp', './test_out')
+        testcat.main()
+
+        with open('./test_out/concatIndex.txt', 'rU') as f:
+            lines = [line.strip() for line in f]
+        self.assertEqual(lines, ['file1.txt|zip1.zip|../zip1/concat1.txt|30|37',
+                                 'file2.txt|zip1.zip|../zip1/concat1.txt|97|74',
+                                 'file3.txt|zip2.zip|../zip2/concat2.txt|30|111',
+                                 'file1.txt|zip2.zip|../zip2/concat3.txt|30|37'])
+
+    def test_read(self):
+        '''
+        Test that original files are read back from stored and compressed entries.
+        '''
+        for compression in ['stored', 'deflate']:
+            testcat = MockCat('./test_data', './test_temp', './test_out')
+            testcat.main(compression = compression)
+
+            with catReader('./test_out') as reader:
+                self.assertEqual(len(reader.locate('file1.txt')), 2)
+                for count in range(1, 4):
+                    with open('./test_data/file%s.txt' % count, 'rU') as f:
+                        text = f.read()
+                    entry = '../zip1/concat1.txt' if count == 1 else None
+                    self.assertEqual(reader.read('file%s.txt' % count, entry), text)
+
+    def test_readErrors(self):
+        '''
+        Test that reading a file that is not in the index or that is in more than one
+        entry without specifying the entry raises an exception.
+        '''
+        testcat = MockCat('./test_data', './test_temp', './test_out')
+        testcat.main()
+
+        with catReader('./test_out') as reader:
+            with self.assertRaises(KeyError):
+                reader.read('file4.txt')
+            with self.assertRaises(ValueError):
+                reader.read('file1.txt')
+            with self.assertRaises(KeyError):
+                reader.read('file1.txt', occurrence = 2)
+
+    def test_readDuplicates(self):
+        '''
+        Test that files with the same name in the same entry are read by their occurrence.
+        '''
+        class DuplicateCat(MockCat):
+            def makeConcatDict(self):
+                MockCat.makeConcatDict(self)
+                os.makedirs('./test_data/other')
+                with open('./test_data/other/file1.txt', 'wb') as f:
+                    f.write('ANOTHER FILE 1.\n')
+                self.concat_dict['concat1'] += ('./test_data/other/file1.txt', )
+
+        testcat = DuplicateCat('./test_data', './test_temp', './test_out')
+        testcat.main()
+
+        with catReader('./test_out') as reader:
+            with self.assertRaisesRegexp(ValueError, 'occurs 2 times'):
+                reader.read('file1.txt', '../zip1/concat1.txt')
+            self.assertEqual(reader.read('file1.txt', '../zip1/concat1.txt', 1), 'ANOTHER FILE 1.\n')
+            self.assertEqual(reader.read('file1.txt', occurrence = 2), 
+                             'THIS IS TEST FILE 1.\nIT HAS 2 LINES.\n')
+
+    def test_staleIndex(self):
+        '''
+        Test that an index locating a file past the end of its entry raises an exception.
+        '''
+        for compression in ['stored', 'deflate']:
+            testcat = MockCat('./test_data', './test_temp', './test_out')
+            testcat.main(compression = compression)
+            with open('./test_out/concatIndex.txt', 'rb') as f:
+                index = f.read()
+            with open('./test_out/concatIndex.txt', 'wb') as f:
+                f.write(index.replace('|30|111', '|300|111'))
+
+            with catReader('./test_out') as reader:
+                with self.assertRaisesRegexp(ValueError, 'out of date'):
+                    reader.read('file3.txt')
+
+    def test_incremental(self):
+        '''
+        Test that an incremental run keeps the index of zip files that are not rebuilt.
+        '''
+        testcat = MockCat('./test_data', './test_temp', './test_out')
+        testcat.main(incremental = True)
+        with open('./test_data/file3.txt', 'wb') as f:
+            f.write('THIS IS TEST FILE 3, CHANGED.\n')
+        testcat.main(incremental = True)
+
+        with catReader('./test_out') as reader:
+            self.assertEqual(reader.read('file3.txt'), 'THIS IS TEST FILE 3, CHANGED.\n')
+            self.assertEqual(reader.read('file2.txt'),
+                             'THIS IS TEST FILE 2.\nIT HAS 3 LINES.\n' * 2)
+
+    def tearDown(self):
+        paths = ['./test_data', './test_out']
+        for path in paths:
+            shutil.rmtree(path, ignore_errors = True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -70,6 +70,24 @@ class test_checkDicts(unittest.TestCase):
         with self.assertRaises(Exception):
             testcat.checkDicts()
     
+    def test_allInvalidKeys(self):
+        '''
+        Test that every key with a non-tuple value is reported in one exception.
+        '''
+        class MockCat(gencat):
+            def makeZipDict(self):
+                self.zip_dict = {'a': ('tuple1', )}
+            def makeConcatDict(self):
+                self.concat_dict = {'b': ('tuple2', ), 'c': ['list'], 'd': 'string', 'e': ('tuple3', )}
+        testcat = MockCat('./test_data', './test_temp', './test_out')
+        testcat.makeConcatDict()
+        testcat.makeZipDict()
+        
+        with self.assertRaises(TypeError) as context:
+            testcat.checkDicts()
+        self.assertIn('concat_dict', str(context.exception))
+        self.assertIn('2 key(s) c, d,', str(context.exception))
+    
     def tearDown(self):
         paths = ['./test_data', './test_temp', './test_out']
         for path in paths:
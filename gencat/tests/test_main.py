@@ -60,6 +60,100 @@ class test_main(unittest.TestCase):
         test_text = '\nNEWFILE\nFILENAME: file1.txt\n\nTHIS IS TEST FILE 1.' + \
                     '\n\nNEWFILE\nFILENAME: file2.txt\n\nTHIS IS TEST FILE 2.\n'
         self.assertEqual(text, test_text)
+        self.assertFalse(os.path.isfile('./test_out/zipManifest.txt'))
+
+    def test_noExtract(self):
+        '''
+        Test that main concatenates files read directly from the zip files in path_in 
+        when extraction is turned off.
+        '''
+        with zipfile.ZipFile('./test_data/in.zip', 'w', zipfile.ZIP_DEFLATED, True) as inzip:
+            inzip.write('./test_data/file1.txt', 'file1.txt')
+            inzip.write('./test_data/file2.txt', 'file2.txt')
+        
+        class MemberCat(MockCat):
+            def makeConcatDict(self):
+                self.concat_dict = {'concat1': tuple(self.listZipMembers())}
+        
+        testcat = MemberCat('./test_data', './test_temp', './test_out')
+        testcat.main(extract = False)
+        
+        self.assertFalse(os.path.isdir('./test_temp'))
+        with open('./test_out/concatDict.txt', 'rU') as f:
+            self.assertEqual(f.read(), 'concat1|in.zip/file1.txt|in.zip/file2.txt\n')
+        with zipfile.ZipFile('./test_out/zip1.zip', 'r') as zf:
+            text = zf.read('../zip1/concat1.txt')
+        
+        test_text = '\nNEWFILE\nFILENAME: file1.txt\n\nTHIS IS TEST FILE 1.' + \
+                    '\n\nNEWFILE\nFILENAME: file2.txt\n\nTHIS IS TEST FILE 2.\n'
+        self.assertEqual(text, test_text)
+
+    def test_incremental(self):
+        '''
+        Test that an incremental run only rebuilds the zip files whose inputs have changed
+        and removes zip files that are no longer in zip_dict.
+        '''
+        class TwoZipCat(MockCat):
+            def makeZipDict(self):
+                self.zip_dict = {'zip1': ('concat1', ), 'zip2': ('concat2', )}
+            def makeConcatDict(self):
+                self.concat_dict = {'concat1': ('./test_data/file1.txt', ), 
+                                    'concat2': ('./test_data/file2.txt', )}
+        
+        testcat = TwoZipCat('./test_data', './test_temp', './test_out')
+        testcat.main(incremental = True)
+        self.assertTrue(os.path.isfile('./test_out/zipManifest.txt'))
+        with open('./test_out/zipManifest.txt', 'rU') as f:
+            self.assertEqual([line.split('|')[0] for line in f], ['zip1', 'zip2'])
+        
+        with open('./test_out/stale.zip', 'wb') as f:
+            f.write('STALE')
+        with open('./test_out/zipManifest.txt', 'ab') as f:
+            f.write('stale|0\n')
+        with open('./test_data/file1.txt', 'wb') as f:
+            f.write('THIS IS TEST FILE 1, CHANGED.\n')
+        with open('./test_out/zip2.zip', 'rb') as f:
+            zip2 = f.read()
+        with open('./test_out/zip2.zip', 'ab') as f:
+            f.write('UNCHANGED')
+        
+        testcat.main(incremental = True)
+        
+        self.assertFalse(os.path.isfile('./test_out/stale.zip'))
+        with open('./test_out/zip2.zip', 'rb') as f:
+            self.assertEqual(f.read(), zip2 + 'UNCHANGED')
+        with zipfile.ZipFile('./test_out/zip1.zip', 'r') as zf:
+            self.assertEqual(zf.namelist(), ['../zip1/concat1.txt'])
+            text = zf.read('../zip1/concat1.txt')
+        self.assertEqual(text, '\nNEWFILE\nFILENAME: file1.txt\n\nTHIS IS TEST FILE 1, CHANGED.\n')
+
+    def test_incrementalFailure(self):
+        '''
+        Test that a zip file left incomplete by a failed incremental run is rebuilt by the next 
+        run, even if its inputs have been restored to those recorded before the failure.
+        '''
+        class FailingCat(MockCat):
+            def writeZip(self, zip_key, date_time, compression = 'deflate'):
+                with open(os.path.join(self.path_out, zip_key + '.zip'), 'wb') as f:
+                    f.write('PARTIAL')
+                raise IOError('Disk full')
+        
+        MockCat('./test_data', './test_temp', './test_out').main(incremental = True)
+        with open('./test_data/file1.txt', 'rb') as f:
+            original = f.read()
+        with open('./test_data/file1.txt', 'wb') as f:
+            f.write('THIS IS TEST FILE 1, CHANGED.\n')
+        with self.assertRaises(IOError):
+            FailingCat('./test_data', './test_temp', './test_out').main(incremental = True)
+        
+        with open('./test_data/file1.txt', 'wb') as f:
+            f.write(original)
+        MockCat('./test_data', './test_temp', './test_out').main(incremental = True)
+        
+        with zipfile.ZipFile('./test_out/zip1.zip', 'r') as zf:
+            text = zf.read('../zip1/concat1.txt')
+        self.assertEqual(text, '\nNEWFILE\nFILENAME: file1.txt\n\nTHIS IS TEST FILE 1.' + 
+                               '\n\nNEWFILE\nFILENAME: file2.txt\n\nTHIS IS TEST FILE 2.\n')
 
     def tearDown(self):
         paths = ['./test_data', './test_out']
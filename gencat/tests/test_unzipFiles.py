@@ -8,7 +8,7 @@ import sys
 os.chdir(os.path.dirname(os.path.realpath(__file__)))
 sys.path.append('../')
 
-from gencat import gencat
+from gencat import gencat, ZipMember
 
 class MockCat(gencat):
     def makeZipDict(self):
@@ -184,6 +184,102 @@ class test_unzipFiles(unittest.TestCase):
                 count = count + 1
             self.assertEqual(count, 2)
 
+    def test_workers(self):
+        '''
+        Test that zip files are extracted by thread and process pools with progress reported 
+        for every member, and that the last archive listed wins when member names collide.
+        '''
+        for n in range(3):
+            with zipfile.ZipFile('test_data/test%s_zip.zip' % n, 'w', zipfile.ZIP_DEFLATED, True) as inzip:
+                for m in range(5):
+                    inzip.writestr('dir%s/test%s_%s.txt' % (n, n, m), 'test%s\n' % m)
+                inzip.writestr('shared.txt', 'test%s' % n)
+        last = [f for f in os.listdir('test_data') if f.endswith('.zip')][-1]
+        
+        for pool in ['thread', 'process']:
+            extracted = []
+            testcat.unzipFiles(workers = 3, pool = pool, 
+                               progress = lambda infile, name: extracted.append(name))
+            
+            self.assertEqual(len(extracted), 16)
+            self.assertEqual(sorted(os.listdir('test_temp')), ['dir0', 'dir1', 'dir2', 'shared.txt'])
+            for n in range(3):
+                self.assertEqual(len(os.listdir('test_temp/dir%s' % n)), 5)
+            with open('test_temp/shared.txt', 'rU') as f:
+                self.assertEqual(f.read(), last.replace('_zip.zip', ''))
+            
+            shutil.rmtree('test_temp')
+            os.makedirs('test_temp')
+        
+        with self.assertRaises(ValueError):
+            testcat.unzipFiles(workers = 2, pool = 'fork')
+
+    def test_archiveOpens(self):
+        '''
+        Test that an archive with many members is opened once when extracted serially, and
+        once per worker, after being listed, when extracted by a pool.
+        '''
+        with zipfile.ZipFile('test_data/test_zip.zip', 'w', zipfile.ZIP_DEFLATED, True) as inzip:
+            for m in range(2000):
+                inzip.writestr('dir/test%s.txt' % m, 'test%s' % m)
+
+        opened = []
+        ZipFile = zipfile.ZipFile
+        class CountingZipFile(ZipFile):
+            def __init__(self, *args, **kwargs):
+                opened.append(args[0])
+                ZipFile.__init__(self, *args, **kwargs)
+
+        zipfile.ZipFile = CountingZipFile
+        try:
+            testcat.unzipFiles()
+            self.assertEqual(len(opened), 1)
+            self.assertEqual(len(os.listdir('test_temp/dir')), 2000)
+
+            shutil.rmtree('test_temp')
+            os.makedirs('test_temp')
+            del opened[:]
+            testcat.unzipFiles(workers = 3)
+            self.assertEqual(len(opened), 1 + 3)
+            self.assertEqual(len(os.listdir('test_temp/dir')), 2000)
+        finally:
+            zipfile.ZipFile = ZipFile
+
+    def test_planExtraction(self):
+        '''
+        Test that extraction tasks refer to archives by path, so that no archive is left open,
+        and that files which are not zip files are skipped. Directories are created up front.
+        '''
+        with zipfile.ZipFile('test_data/test1_zip.zip', 'w', zipfile.ZIP_DEFLATED, True) as inzip:
+            inzip.writestr('dir/', '')
+            inzip.writestr('dir/test1_text.txt', 'test1')
+        with open('test_data/test.txt', 'wb') as f:
+            f.write('test')
+
+        tasks = testcat.planExtraction(['test_data/test.txt', 'test_data/test1_zip.zip'])
+
+        self.assertEqual(tasks, [('test_data/test1_zip.zip', ['dir/test1_text.txt'],
+                                  testcat.path_temp)])
+        self.assertTrue(os.path.isdir('test_temp/dir'))
+
+    def test_listZipMembers(self):
+        '''
+        Test that the files stored in zip files are listed without being extracted.
+        '''
+        with zipfile.ZipFile('test_data/test2_zip.zip', 'w', zipfile.ZIP_DEFLATED, True) as inzip:
+            inzip.writestr('dir/', '')
+            inzip.writestr('dir/test2_text.txt', 'test2')
+        with zipfile.ZipFile('test_data/test1_zip.zip', 'w', zipfile.ZIP_DEFLATED, True) as inzip:
+            inzip.writestr('test1_text.txt', 'test1')
+        with open('test_data/test.txt', 'wb') as f:
+            f.write('test')
+        
+        members = testcat.listZipMembers()
+        
+        self.assertEqual(members, [ZipMember('./test_data/test1_zip.zip', 'test1_text.txt'),
+                                   ZipMember('./test_data/test2_zip.zip', 'dir/test2_text.txt')])
+        self.assertEqual(os.listdir('test_temp'), [])
+
     def tearDown(self):
         paths = ['./test_data', './test_temp', './test_out']
         for path in paths:
@@ -82,6 +82,22 @@ class test_writeDict(unittest.TestCase):
         lines = lines.strip()
         self.assertEqual(lines, 'path|a/path/file.txt')
     
+    def test_relPaths(self):
+        '''
+        Test that elements are shortened exactly as by os.path.relpath.
+        '''
+        vals = ('path/to/file1.txt', 'path/to/file2.txt', 'path/file3.txt', 'file4.txt', 
+                './path/to/../file5.txt', '/abs/path/file6.txt', 'path/to/dir/', 'path/to/..')
+        for rel_path in ['path/to/', 'path', '', '.', 'other', '/abs']:
+            d = {'b': vals, 'a': vals[::-1]}
+            testcat.writeDict(d, 'test_dict.txt', rel_path)
+            
+            with open('./test_out/test_dict.txt', 'rU') as f:
+                lines = f.readlines()
+            expected = ['|'.join(['a'] + [os.path.relpath(v, rel_path) for v in vals[::-1]]) + '\n',
+                        '|'.join(['b'] + [os.path.relpath(v, rel_path) for v in vals]) + '\n']
+            self.assertEqual(lines, expected)
+    
     def tearDown(self):
         paths = ['./test_data', './test_temp', './test_out']
         for path in paths:
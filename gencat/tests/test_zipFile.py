@@ -8,7 +8,8 @@ import sys
 os.chdir(os.path.dirname(os.path.realpath(__file__)))
 
 sys.path.append('../../')
-from gencat import gencat
+from gencat import gencat, ZipMember
+gencat_module = sys.modules[gencat.__module__]
 
 
 class MockCat(gencat):
@@ -139,6 +140,128 @@ class test_zipFiles(unittest.TestCase):
         self.assertEqual(text1, '\nNEWFILE\nFILENAME: file1.txt\n\nTHIS IS A TEST FILE.\n')
         self.assertEqual(text2, '\nNEWFILE\nFILENAME: file2.txt\n\nTHIS IS A TEST FILE.\n')
     
+    def test_noIntermediateFiles(self):
+        '''
+        Test that concatenated files are streamed into the zip file without writing 
+        copies to path_temp or to a directory named for the zip file.
+        '''
+        testcat = MockCat('./test_data', './test_temp', './test_out')
+        testcat.zip_dict = {} 
+        testcat.zip_dict['zip1'] = ('concat1', )
+        testcat.concat_dict = {}
+        testcat.concat_dict['concat1'] = ('./test_data/file1.txt', ) + ('./test_data/file2.txt', )
+        
+        testcat.zipFiles()
+        
+        self.assertEqual(os.listdir('./test_temp'), [])
+        self.assertFalse(os.path.isdir('../zip1'))
+        with zipfile.ZipFile('./test_out/zip1.zip', 'r') as zf:
+            self.assertEqual(zf.namelist(), ['../zip1/concat1.txt'])
+            self.assertIsNone(zf.testzip())
+    
+    def test_chunkedNewlines(self):
+        '''
+        Test that Windows line endings are translated when they straddle a chunk boundary.
+        '''
+        with open('./test_data/file1.txt', 'wb') as f:
+            f.write('LINE ONE\r\nLINE TWO\r\n')
+        testcat = MockCat('./test_data', './test_temp', './test_out')
+        testcat.zip_dict = {'zip1': ('concat1', )}
+        testcat.concat_dict = {'concat1': ('./test_data/file1.txt', )}
+        
+        chunk_size = gencat_module.CHUNK_SIZE
+        gencat_module.CHUNK_SIZE = 9
+        try:
+            testcat.zipFiles()
+        finally:
+            gencat_module.CHUNK_SIZE = chunk_size
+        
+        with zipfile.ZipFile('./test_out/zip1.zip', 'r') as zf:
+            text = zf.read('../zip1/concat1.txt')
+        self.assertEqual(text, '\nNEWFILE\nFILENAME: file1.txt\n\nLINE ONE\nLINE TWO\n')
+    
+    def test_zipMember(self):
+        '''
+        Test that files stored in a zip file are concatenated without being extracted.
+        '''
+        with zipfile.ZipFile('./test_data/in.zip', 'w', zipfile.ZIP_DEFLATED, True) as inzip:
+            inzip.writestr('dir/file3.txt', 'LINE ONE\r\nLINE TWO\rLINE THREE\n')
+        testcat = MockCat('./test_data', './test_temp', './test_out')
+        testcat.zip_dict = {'zip1': ('concat1', )}
+        testcat.concat_dict = {'concat1': ('./test_data/file1.txt', 
+                                           ZipMember('./test_data/in.zip', 'dir/file3.txt'))}
+        
+        testcat.zipFiles()
+        
+        self.assertEqual(os.listdir('./test_temp'), [])
+        with zipfile.ZipFile('./test_out/zip1.zip', 'r') as zf:
+            text = zf.read('../zip1/concat1.txt')
+        test_text = '\nNEWFILE\nFILENAME: file1.txt\n\nTHIS IS A TEST FILE.' + \
+                    '\n\nNEWFILE\nFILENAME: file3.txt\n\nLINE ONE\nLINE TWO\nLINE THREE\n'
+        self.assertEqual(text, test_text)
+    
+    def test_translateNewlines(self):
+        '''
+        Test that line endings are translated as in universal newline mode however the 
+        text is split into chunks.
+        '''
+        text = 'a\r\nb\rc\nd\r\r\ne\n\rf\r'
+        with open('./test_data/newlines.txt', 'wb') as f:
+            f.write(text)
+        with open('./test_data/newlines.txt', 'rU') as f:
+            expected = f.read()
+        
+        for i in range(len(text) + 1):
+            for j in range(i, len(text) + 1):
+                chunks = [text[:i], text[i:j], text[j:]]
+                self.assertEqual(''.join(gencat_module.translateNewlines(chunks)), expected)
+    
+    def test_workers(self):
+        '''
+        Test that zip files built by a pool of processes match those built serially.
+        '''
+        testcat = MockCat('./test_data', './test_temp', './test_out')
+        testcat.zip_dict = {'zip1': ('concat1', ), 'zip2': ('concat2', 'concat3')}
+        testcat.concat_dict = {'concat1': ('./test_data/file1.txt', ),
+                               'concat2': ('./test_data/file2.txt', ),
+                               'concat3': ('./test_data/file1.txt', './test_data/file2.txt')}
+        
+        serial_index = testcat.zipFiles()
+        serial = {}
+        for zip_key in ['zip1', 'zip2']:
+            with zipfile.ZipFile('./test_out/%s.zip' % zip_key, 'r') as zf:
+                serial[zip_key] = [(i.filename, i.CRC, i.file_size) for i in zf.infolist()]
+            os.remove('./test_out/%s.zip' % zip_key)
+        
+        self.assertEqual(testcat.zipFiles(workers = 2), serial_index)
+        for zip_key in ['zip1', 'zip2']:
+            with zipfile.ZipFile('./test_out/%s.zip' % zip_key, 'r') as zf:
+                parallel = [(i.filename, i.CRC, i.file_size) for i in zf.infolist()]
+            self.assertEqual(parallel, serial[zip_key])
+    
+    def test_compression(self):
+        '''
+        Test that each zip file is compressed as specified and that unknown compressions are rejected.
+        '''
+        testcat = MockCat('./test_data', './test_temp', './test_out')
+        testcat.zip_dict = {'zip1': ('concat1', ), 'zip2': ('concat2', ), 'zip3': ('concat1', )}
+        testcat.concat_dict = {'concat1': ('./test_data/file1.txt', ),
+                               'concat2': ('./test_data/file2.txt', )}
+        
+        testcat.zipFiles(compression = {'zip1': 'stored', 'zip2': 'deflate:1'})
+        
+        for zip_key, compress_type in [('zip1', zipfile.ZIP_STORED), ('zip2', zipfile.ZIP_DEFLATED),
+                                       ('zip3', zipfile.ZIP_DEFLATED)]:
+            with zipfile.ZipFile('./test_out/%s.zip' % zip_key, 'r') as zf:
+                zinfo = zf.infolist()[0]
+                text  = zf.read(zinfo)
+            self.assertEqual(zinfo.compress_type, compress_type)
+            self.assertEqual(text[-21:], 'THIS IS A TEST FILE.\n')
+        
+        for compression in ['bzip2', 'deflate:10', 'stored:1']:
+            with self.assertRaises(ValueError):
+                testcat.zipFiles(compression = compression)
+    
     def tearDown(self):
         paths = ['./test_data', './test_temp', './test_out']
         for path in paths:
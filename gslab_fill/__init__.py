@@ -4,8 +4,13 @@ gslab_fill: A library for filling LyX templates with tablular data and Stata out
 
 gslab_fill provides two functions for filling LyX template files with data. 
 These are `tablefill` and `textfill`. Please see their docstrings for informations
-on their use and functionalities.
+on their use and functionalities. `tablefill_batch` fills several templates
+from one set of input files, and `lyxfill` applies both tablefill and textfill
+to a template in one pass. `batchfill` fills the documents listed in a manifest 
+in parallel, and can be run from the command line as batchfill.py.
 '''
 
-from tablefill import tablefill
+from tablefill import tablefill, tablefill_batch
 from textfill import textfill
+from lyxfill import lyxfill
+from batchfill import batchfill
@@ -0,0 +1,48 @@
+def write_if_changed(path, content):
+    '''
+    Write content to path unless path already holds exactly content, in which case
+    the file and its modification time are left untouched. Returns whether path
+    was written.
+
+    content is an iterable of strings and of iterables of strings, such as the
+    verbatim blocks of textfill, which are written in turn without being joined
+    into one string. It is compared with path as it is produced, and path is then
+    rewritten in place from the first difference, so that a symbolic link, the
+    permissions and the owner of path are kept.
+    '''
+    chunks = flatten(content)
+    try:
+        existing = open(path, 'rb')
+    except IOError:
+        with open(path, 'wb') as outfile:
+            outfile.writelines(chunks)
+        return True
+
+    position = 0
+    chunk = ''
+    with existing:
+        for chunk in chunks:
+            if existing.read(len(chunk)) != chunk:
+                break
+            position += len(chunk)
+        else:
+            if not existing.read(1):
+                return False
+            chunk = ''
+
+    with open(path, 'r+b') as outfile:
+        outfile.seek(position)
+        outfile.write(chunk)
+        outfile.writelines(chunks)
+        outfile.truncate()
+
+    return True
+
+
+def flatten(content):
+    for part in content:
+        if isinstance(part, basestring):
+            yield part
+        else:
+            for chunk in part:
+                yield chunk
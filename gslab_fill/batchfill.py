@@ -0,0 +1,202 @@
+#! /usr/bin/env python
+'''
+Fill the LyX documents listed in a manifest in parallel.
+
+Usage:
+    python batchfill.py manifest.json [--processes N]
+
+The manifest is a JSON list with one object per document. The key 'type' of
+each is 'tablefill' (the default), 'textfill' or 'lyxfill', and its other keys
+are the arguments of that function, e.g.
+
+```
+[{"type": "tablefill", "template": "paper.lyx", "output": "paper_filled.lyx",
+  "input": "tables.txt more_tables.txt"},
+ {"type": "textfill", "template": "appendix.lyx", "output": "appendix_filled.lyx",
+  "input": "stata.log", "remove_echoes": true}]
+```
+
+Each input is read and parsed once, however many documents use it. The inputs
+are parsed, and then the documents filled, across one pool of processes. 
+batchfill reports how long each input took to parse and each document to fill,
+and exits with status 1 if any document could not be filled.
+'''
+
+import re
+import sys
+import time
+import tablefill as _tablefill
+import textfill as _textfill
+import lyxfill as _lyxfill
+
+# Much faster than an anchored pattern in MULTILINE mode
+tab_label_line = re.compile(r'\nname "tab:(.*)')
+
+
+def batchfill(manifest, processes = 1):
+    '''
+    Fill the documents of manifest, a list of jobs or the path of a JSON file
+    holding one, in up to processes processes. Returns the (output, message,
+    seconds) of each job, in order, and the (inputs, seconds) of each input parsed.
+    '''
+    if not isinstance(manifest, list):
+        import json
+        with open(manifest, 'rU') as manifest_file:
+            manifest = json.load(manifest_file)
+
+    # Collect the table tags the inputs of each template must provide
+    tasks = []
+    table_tags = {}
+    for job in manifest:
+        # The fillers expect byte strings, as the rest of the LyX file is read as such
+        job = dict((str(key), value.encode('utf-8') if isinstance(value, unicode) else value)
+                   for key, value in job.items())
+        try:
+            task = prepare_job(job)
+            for key, tags in task['tables']:
+                table_tags.setdefault(key, set()).update(tags)
+        except:
+            task = {'output': job.get('output'), 'message': _tablefill.report_error()}
+        tasks.append(task)
+
+    # Every input is parsed once, and then handed to the jobs that use it
+    keys = sorted(table_tags) + sorted(set(task['text'] for task in tasks if task.get('text')))
+    parse_tasks = [(key, table_tags.get(key)) for key in keys]
+
+    pool = None
+    if processes > 1 and max(len(tasks), len(parse_tasks)) > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(min(processes, max(len(tasks), len(parse_tasks))))
+    try:
+        if pool:
+            parsed = pool.map(_parse_worker, parse_tasks, 1)
+        else:
+            parsed = [_parse_worker(parse_task) for parse_task in parse_tasks]
+        shared = dict((key, inputs) for key, (inputs, seconds) in zip(keys, parsed))
+        timings = [(' '.join(key[1]), seconds) for key, (inputs, seconds) in zip(keys, parsed)]
+
+        # Each job is sent only the inputs it uses
+        for task in tasks:
+            if 'message' not in task:
+                task['inputs'] = dict((key, shared[key]) for key, tags in task['tables'])
+                if task['text']:
+                    task['inputs'][task['text']] = shared[task['text']]
+        if pool:
+            results = pool.map(_fill_worker, tasks, 1)
+        else:
+            results = [_fill_worker(task) for task in tasks]
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    return results, timings
+
+
+def prepare_job(job):
+    '''
+    Return the task filling the document of job: its type, its arguments and the 
+    keys of the shared inputs it needs, with the table tags used by its template.
+    '''
+    fill_type = job.pop('type', 'tablefill')
+    task = {'type': fill_type, 'output': job.get('output'), 'tables': [], 'text': None}
+    if fill_type == 'tablefill':
+        args = _tablefill.parse_arguments(job)
+        task['tables'] = [(('tables', tuple(args['input'])), table_tags(args['template']))]
+    elif fill_type == 'textfill':
+        args = _textfill.parse_arguments(job)
+        task['text'] = ('text', tuple(args['input']), args['prefix'], args['remove_echoes'])
+    elif fill_type == 'lyxfill':
+        args = _lyxfill.parse_arguments(job)
+        if args['table_input']:
+            task['tables'] = [(('tables', tuple(args['table_input'])), 
+                               table_tags(args['template']))]
+        if args['text_input']:
+            task['text'] = ('text', tuple(args['text_input']), args['prefix'], args['remove_echoes'])
+    else:
+        raise ValueError("Unknown fill type '%s'" % fill_type)
+    task['args'] = args
+    
+    return task
+
+
+def table_tags(template):
+    '''
+    Return the tags of the tables labelled in template, as scan_template reads them,
+    without scanning the tables themselves.
+    '''
+    with open(template, 'rU') as lyx_file:
+        return set(label.replace('name "tab:', '').rstrip('"').lower() 
+                   for label in tab_label_line.findall('\n' + lyx_file.read()))
+
+
+def _parse_worker(parse_task):
+    key, tags = parse_task
+    start = time.time()
+    try:
+        if key[0] == 'tables':
+            inputs = _tablefill.parse_tables({'input': list(key[1])}, tags)
+        else:
+            inputs = _textfill.parse_text({'input': list(key[1]), 'prefix': key[2],
+                                           'remove_echoes': key[3]})
+    except:
+        inputs = _tablefill.report_error()
+
+    return inputs, time.time() - start
+
+def _fill_worker(task):
+    start = time.time()
+    if 'message' in task:
+        return task['output'], task['message'], 0.0
+    try:
+        inputs = [task['inputs'][key] for key, tags in task['tables']]
+        if task['text']:
+            inputs.append(task['inputs'][task['text']])
+        for parsed in inputs:
+            # Inputs that failed to parse hold their error message
+            if isinstance(parsed, basestring):
+                return task['output'], parsed, 0.0
+
+        args = task['args']
+        if task['type'] == 'tablefill':
+            lyx_text, labels = _tablefill.load_template(args['template'], args['cache'])
+            message = _tablefill.fill_template(args, lyx_text, labels, inputs[0])
+        elif task['type'] == 'textfill':
+            message = _textfill.fill_text(args, inputs[0])
+        else:
+            lyx_text, labels, text_labels = _lyxfill.load_template(args['template'])
+            tables = task['inputs'][task['tables'][0][0]] if task['tables'] else None
+            text = task['inputs'][task['text']] if task['text'] else None
+            message = _lyxfill.fill_document(args, lyx_text, labels, text_labels, tables, text)
+    except:
+        message = _tablefill.report_error()
+
+    return task['output'], message, time.time() - start
+
+
+def main():
+    import argparse
+    import multiprocessing
+    parser = argparse.ArgumentParser(description = 'Fill the LyX documents listed in a manifest.')
+    parser.add_argument('manifest', help = 'JSON list of tablefill, textfill and lyxfill jobs')
+    parser.add_argument('--processes', type = int, default = multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    start = time.time()
+    results, timings = batchfill(args.manifest, args.processes)
+    print
+    for inputs, seconds in timings:
+        print '%8.3fs  parsed %s' % (seconds, inputs)
+    failed = 0
+    for output, message, seconds in results:
+        ok = 'filled successfully' in message
+        failed += not ok
+        print '%8.3fs  %s %s' % (seconds, 'filled' if ok else 'FAILED', output)
+    print '%d of %d documents filled in %.3fs' % (len(results) - failed, len(results),
+                                                  time.time() - start)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
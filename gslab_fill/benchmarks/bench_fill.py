@@ -0,0 +1,133 @@
+#! /usr/bin/env python
+'''
+Measure the phases of tablefill and textfill on synthetic templates and inputs.
+
+Usage:
+    python bench_fill.py [--tables N] [--cells N] [--tags N] [--lines N]
+                         [--repeat N] [--profile FILE] [--keep DIR]
+
+The tablefill input holds --tables tables of --cells entries apiece, and its
+template a table for each. The textfill input is a Stata log of --tags tagged
+sections of --lines lines apiece, and its template a label for each.
+
+For each phase the best wall time over --repeat runs is reported. With
+--profile, each phase is also run once under cProfile: the statistics of all
+phases are written to FILE and the most expensive functions of each are
+printed.
+'''
+import argparse
+import cProfile
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..'))
+from gslab_fill import tablefill as _tablefill, textfill as _textfill
+from corpus import write_tables_input, write_tables_template, write_log, write_text_template
+
+tablefill_module = sys.modules[_tablefill.__module__]
+textfill_module  = sys.modules[_textfill.__module__]
+
+
+def tablefill_phases(args):
+    state = {}
+    def parse_tables():
+        state['tables'] = tablefill_module.parse_tables(args)
+    def insert_tables():
+        state['lyx_text'] = tablefill_module.insert_tables(args, state['tables'])
+    def insert_warning():
+        tablefill_module.insert_warning(args, list(state['lyx_text']))
+    def write_to_lyx():
+        tablefill_module.write_to_lyx(args, state['lyx_text'])
+    
+    return [('parse_tables', parse_tables), ('insert_tables', insert_tables), 
+            ('insert_warning', insert_warning), ('write_to_lyx', write_to_lyx)]
+
+
+def textfill_phases(args):
+    state = {}
+    def read_text():
+        state['text'] = textfill_module.read_text(args['input'], args['prefix'])
+    def clean_text():
+        # clean_text modifies its argument, so it is given the result of read_text afresh
+        text = textfill_module.text_parser(args['prefix'])
+        text.results = dict(state['text'].results)
+        state['cleaned'] = textfill_module.clean_text(text, args['remove_echoes'])
+    def insert_text():
+        state['lyx_text'] = textfill_module.insert_text(args, state['cleaned'])
+    def write_to_lyx():
+        textfill_module.write_to_lyx(args, state['lyx_text'])
+    
+    return [('read_text', read_text), ('clean_text', clean_text), 
+            ('insert_text', insert_text), ('write_to_lyx', write_to_lyx)]
+
+
+def run_phases(name, phases, repeat, profile):
+    for phase_name, phase in phases:
+        times = []
+        for _ in range(repeat):
+            start = time.time()
+            phase()
+            times.append(time.time() - start)
+        print '%-10s %-16s %10.3f' % (name, phase_name, min(times))
+        if profile is not None:
+            profiler = cProfile.Profile()
+            profiler.runcall(phase)
+            stats = pstats.Stats(profiler, stream = sys.stdout)
+            stats.sort_stats('cumulative').print_stats(8)
+            profile.append(profiler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark the phases of tablefill and textfill.')
+    parser.add_argument('--tables', type = int, default = 200)
+    parser.add_argument('--cells', type = int, default = 500)
+    parser.add_argument('--tags', type = int, default = 50)
+    parser.add_argument('--lines', type = int, default = 2000)
+    parser.add_argument('--repeat', type = int, default = 3)
+    parser.add_argument('--profile', help = 'File to which to write cProfile statistics')
+    parser.add_argument('--keep', help = 'Directory in which to keep the inputs and outputs')
+    args = parser.parse_args()
+
+    root = args.keep or tempfile.mkdtemp()
+    try:
+        if not os.path.isdir(root):
+            os.makedirs(root)
+        tables_input    = os.path.join(root, 'tables.txt')
+        tables_template = os.path.join(root, 'tables_template.lyx')
+        log             = os.path.join(root, 'input.log')
+        text_template   = os.path.join(root, 'text_template.lyx')
+        write_tables_input(tables_input, args.tables, args.cells)
+        write_tables_template(tables_template, args.tables, args.cells)
+        write_log(log, args.tags, args.lines)
+        write_text_template(text_template, args.tags)
+        print 'tablefill: %d tables of %d cells, input %.1f MB, template %.1f MB' % \
+              (args.tables, args.cells, os.path.getsize(tables_input) / 1e6, 
+               os.path.getsize(tables_template) / 1e6)
+        print 'textfill:  %d sections of %d lines, input %.1f MB' % \
+              (args.tags, args.lines, os.path.getsize(log) / 1e6)
+
+        profile = [] if args.profile else None
+        
+        table_args = tablefill_module.parse_arguments({'input': tables_input, 
+                                                       'template': tables_template, 
+                                                       'output': os.path.join(root, 'tables.lyx')})
+        run_phases('tablefill', tablefill_phases(table_args), args.repeat, profile)
+        text_args = textfill_module.parse_arguments({'input': log, 
+                                                     'template': text_template, 
+                                                     'output': os.path.join(root, 'text.lyx')})
+        run_phases('textfill', textfill_phases(text_args), args.repeat, profile)
+        
+        if profile is not None:
+            pstats.Stats(*profile).dump_stats(args.profile)
+            print 'cProfile statistics written to %s' % args.profile
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors = True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#! /usr/bin/env python
+'''
+Measure how long gslab_scons and gslab_fill take to import.
+
+Usage:
+    python bench_import.py [--repeat N] [module ...]
+
+Each module (by default gslab_scons, gslab_fill and gslab_fill.tablefill) is
+imported --repeat times, each time in a fresh Python interpreter, as SCons does
+on every run. For each the best wall time of the import is reported with the
+number of modules it loaded, and any of the slow standard library modules
+listed in slow_modules, or gslab_fill, that it loaded.
+'''
+import argparse
+import os
+import subprocess
+import sys
+
+root = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..')
+
+# Modules that take long to import and that importing gslab_scons should not load
+slow_modules = ['gslab_fill', 'argparse', 'decimal', 'json', 'multiprocessing',
+                'HTMLParser', 'numpy', 'requests']
+
+measure = '''
+import sys, time
+before = set(sys.modules)
+start = time.time()
+import %s
+seconds = time.time() - start
+loaded = [name for name in set(sys.modules) - before if sys.modules[name] is not None]
+print seconds, len(loaded), ' '.join(sorted(loaded))
+'''
+
+
+def time_import(module):
+    '''
+    Import module in a fresh interpreter and return the seconds the import took
+    and the names of the modules it loaded.
+    '''
+    output = subprocess.check_output([sys.executable, '-c', measure % module], cwd = root)
+    seconds, count, loaded = (output.strip() + ' ').split(' ', 2)
+
+    return float(seconds), loaded.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark importing gslab_scons and gslab_fill.')
+    parser.add_argument('modules', nargs = '*',
+                        default = ['gslab_scons', 'gslab_fill', 'gslab_fill.tablefill'])
+    parser.add_argument('--repeat', type = int, default = 10)
+    args = parser.parse_args()
+
+    print '%-22s %10s %8s  %s' % ('module', 'ms', 'modules', 'slow modules loaded')
+    for module in args.modules:
+        runs = [time_import(module) for _ in range(args.repeat)]
+        seconds = min(run[0] for run in runs)
+        loaded = runs[0][1]
+        slow = [name for name in slow_modules if name in loaded]
+        print '%-22s %10.1f %8d  %s' % (module, seconds * 1000, len(loaded),
+                                        ' '.join(slow) or '-')
+
+
+if __name__ == '__main__':
+    main()
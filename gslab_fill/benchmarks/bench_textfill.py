@@ -0,0 +1,88 @@
+#! /usr/bin/env python
+'''
+Measure the phases of textfill on a synthetic Stata log with long tagged sections.
+
+Usage:
+    python bench_textfill.py [--lines N] [--tags N] [--repeat N]
+
+The log holds --tags tagged sections of --lines lines apiece, and the template
+has one label for each. For each phase of textfill the best wall time over
+--repeat runs is reported, followed by the peak resident set size. The time to
+build the LyX code of one section in memory and to write it straight to a file
+with write_data_to_lyx is reported separately.
+'''
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..'))
+from gslab_fill.textfill import (parse_arguments, parse_text, insert_text, write_to_lyx, 
+                                 write_data_to_lyx)
+from corpus import write_log, write_text_template
+
+
+def best(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        result = function()
+        times.append(time.time() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark the phases of textfill.')
+    parser.add_argument('--lines', type = int, default = 1000000)
+    parser.add_argument('--tags', type = int, default = 1)
+    parser.add_argument('--repeat', type = int, default = 3)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        log      = os.path.join(root, 'input.log')
+        template = os.path.join(root, 'template.lyx')
+        output   = os.path.join(root, 'output.lyx')
+        write_log(log, args.tags, args.lines)
+        write_text_template(template, args.tags)
+        print 'Log: %d sections of %d lines, %.1f MB' % (args.tags, args.lines,
+                                                         os.path.getsize(log) / 1e6)
+
+        fill_args = parse_arguments({'input': log, 'template': template, 'output': output})
+        seconds, text = best(lambda: parse_text(fill_args), args.repeat)
+        print '%-20s %10.3f' % ('parse_text', seconds)
+        seconds, lyx_text = best(lambda: insert_text(fill_args, text), args.repeat)
+        print '%-20s %10.3f' % ('insert_text', seconds)
+        if os.path.isfile(output):
+            os.remove(output)
+        seconds, _ = best(lambda: write_to_lyx(fill_args, lyx_text), 1)
+        print '%-20s %10.3f %10.1f MB' % ('write_to_lyx', seconds, os.path.getsize(output) / 1e6)
+        seconds, _ = best(lambda: write_to_lyx(fill_args, lyx_text), args.repeat)
+        print '%-20s %10.3f' % ('write_to_lyx again', seconds)
+
+        data = text.results['tag0']
+        seconds, _ = best(lambda: write_data_to_lyx(data, 'Default'), args.repeat)
+        print '%-20s %10.3f' % ('write_data_to_lyx', seconds)
+        def stream():
+            with open(output, 'wb') as outfile:
+                write_data_to_lyx(data, 'Default', outfile)
+        seconds, _ = best(stream, args.repeat)
+        print '%-20s %10.3f' % ('  to a file', seconds)
+
+        if resource is not None:
+            # ru_maxrss is in bytes on OS X and kilobytes elsewhere
+            scale = 1e6 if sys.platform == 'darwin' else 1e3
+            print 'peak MB %.1f' % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale)
+    finally:
+        shutil.rmtree(root, ignore_errors = True)
+
+
+if __name__ == '__main__':
+    main()
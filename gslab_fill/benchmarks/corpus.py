@@ -0,0 +1,69 @@
+'''
+Synthetic templates and inputs for the gslab_fill benchmarks.
+'''
+import random
+
+
+def write_tables_input(path, tables, cells, seed = 0):
+    '''
+    Write an input file for tablefill with tables tables of cells entries apiece,
+    ten tab-delimited entries to a row, to path.
+    '''
+    rng = random.Random(seed)
+    with open(path, 'wb') as infile:
+        for table in range(tables):
+            infile.write('<tab:table%d>\n' % table)
+            entries = ['%.6f' % rng.gauss(0, 1000) for _ in range(cells)]
+            infile.write(''.join('\t'.join(entries[start:start + 10]) + '\n'
+                                 for start in range(0, cells, 10)))
+
+
+def write_tables_template(path, tables, cells):
+    '''
+    Write a LyX template with a table labelled for each table of write_tables_input
+    to path. Its cells cycle through rounding, comma and ### placeholders.
+    '''
+    placeholders = ['#2#', '#3,#', '#0,#', '###', '#1#']
+    with open(path, 'wb') as template:
+        template.write('#LyX 2.0 created this file.\n\\begin_document\n\\begin_body\n')
+        for table in range(tables):
+            template.write('\\begin_layout Standard\n\\begin_inset Float table\n'
+                           '\\begin_inset CommandInset label\nLatexCommand label\n'
+                           'name "tab:table%d"\n\n\\end_inset\n\n\\begin_inset Tabular\n'
+                           '<lyxtabular version="3" rows="%d" columns="10">\n' 
+                           % (table, (cells + 9) // 10))
+            for cell in range(cells):
+                template.write('<cell alignment="center" valignment="top" usebox="none">\n'
+                               '\\begin_inset Text\n\n\\begin_layout Plain Layout\n'
+                               '%s\n\\end_layout\n\n\\end_inset\n</cell>\n' 
+                               % placeholders[cell % len(placeholders)])
+            template.write('</lyxtabular>\n\n\\end_inset\n\n\\end_inset\n\n\n\\end_layout\n')
+        template.write('\\end_body\n\\end_document\n')
+
+
+def write_log(path, tags, lines):
+    '''
+    Write a Stata log with tags sections of lines lines apiece, tagged as by 
+    insert_tag, to path.
+    '''
+    with open(path, 'wb') as log:
+        for tag in range(tags):
+            log.write('. insert_tag tag%d, open\n<textfill_tag%d>\n' % (tag, tag))
+            for start in range(0, lines, 10000):
+                log.write(''.join('  %8d |  %10.4f  %10.4f  %6d\n' % (n, n * 0.25, n / 3.0, n % 7)
+                                  for n in range(start, min(start + 10000, lines))))
+            log.write('. insert_tag tag%d, close\n</textfill_tag%d>\n' % (tag, tag))
+
+
+def write_text_template(path, tags):
+    '''
+    Write a LyX template with a text label for each section of write_log to path.
+    '''
+    with open(path, 'wb') as template:
+        template.write('#LyX 2.0 created this file.\n\\begin_document\n\\begin_body\n')
+        for tag in range(tags):
+            template.write('\\begin_layout Standard\n\\begin_inset Flex Text\nstatus open\n\n'
+                           '\\begin_layout Plain Layout\n\\begin_inset CommandInset label\n'
+                           'LatexCommand label\nname "text:tag%d"\n\n\\end_inset\n\n\n'
+                           '\\end_layout\n\n\\end_inset\n\n\n\\end_layout\n' % tag)
+        template.write('\\end_body\n\\end_document\n')
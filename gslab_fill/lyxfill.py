@@ -0,0 +1,97 @@
+#! /usr/bin/env python
+
+import traceback
+import lyxfill_info
+import tablefill as _tablefill
+import textfill as _textfill
+from _output import write_if_changed
+
+
+def lyxfill(**kwargs):
+    try:
+        args = parse_arguments(kwargs)
+        lyx_text, labels, text_labels = load_template(args['template'])
+        tables = None
+        if args['table_input']:
+            table_args = dict(args, input = args['table_input'])
+            tables = _tablefill.parse_tables(table_args, set(label[0] for label in labels))
+        text = None
+        if args['text_input']:
+            text = _textfill.parse_text(dict(args, input = args['text_input']))
+        return fill_document(args, lyx_text, labels, text_labels, tables, text)
+    except:
+        print 'Error Found'
+        exitmessage = traceback.format_exc()
+        print exitmessage
+        return exitmessage
+
+# Set lyxfill's docstring as the text in "lyxfill_info.py"
+lyxfill.__doc__ = lyxfill_info.__doc__
+
+
+def parse_arguments(kwargs):
+    args = _textfill.parse_arguments(kwargs)
+    for key in ['table_input', 'text_input']:
+        if key in kwargs.keys():
+            args[key] = kwargs[key].split()
+        else:
+            args[key] = []
+    
+    return args
+
+
+def load_template(template):
+    '''
+    Return the lines of template, its table labels and its text labels, as found
+    by scan_template.
+    '''
+    lyx_text = open(template, 'rU').readlines()
+    text_labels = []
+    labels = _tablefill.scan_template(lyx_text, text_labels)
+    
+    return lyx_text, labels, text_labels
+
+
+def fill_document(args, lyx_text, labels, text_labels, tables, text):
+    '''
+    Fill the template of args with tables, as parsed by tablefill, and text, as 
+    parsed by textfill, and write the output. Either may be None.
+    '''
+    if tables is not None:
+        lyx_text = _tablefill.fill_tables(lyx_text, labels, tables)
+    if text is not None:
+        lyx_text = insert_text(args, text, lyx_text, text_labels)
+    if tables is not None:
+        lyx_text = _tablefill.insert_warning(dict(args, input = args['table_input']), lyx_text)
+    changed = write_if_changed(args['output'], lyx_text)
+    exitmessage = args['template'] + ' filled successfully by lyxfill'
+    if not changed:
+        exitmessage += ' (%s unchanged)' % args['output']
+    print exitmessage
+    
+    return exitmessage
+
+
+def insert_text(args, text, lyx_text, text_labels):
+    '''
+    Return lyx_text with the LyX code of each tagged section of text inserted as 
+    textfill inserts it, at the positions of text_labels found by scan_template.
+    '''
+    insertions = {}
+    lyx_codes = {}
+    for tag, label_line, end_line in text_labels:
+        # textfill never reads a label on the first line of the template
+        if label_line > 0 and tag in text.results:
+            if end_line is None:
+                raise IndexError('No layout is closed after a text label in %s' % args['template'])
+            if tag not in lyx_codes:
+                lyx_codes[tag] = _textfill.verbatim_block(text.results[tag], args['size'])
+            insertions.setdefault(end_line, []).append(lyx_codes[tag])
+    
+    filled_text = []
+    for n, line in enumerate(lyx_text):
+        filled_text.append(line)
+        if n in insertions:
+            filled_text.extend(reversed(insertions[n]))
+    
+    return filled_text
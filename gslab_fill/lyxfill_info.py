@@ -0,0 +1,52 @@
+'''
+#################################################################
+#  lyxfill_readme.txt - Help/Documentation for lyxfill.py
+#################################################################
+
+Description:
+lyxfill.py is a Python module that fills both the tables of tablefill.py and 
+the text labels of textfill.py in a LyX file at once.
+
+Usage:
+Running tablefill on a template and then textfill on its output reads, searches 
+and writes the LyX file twice. Lyxfill finds the 'tab:' and 'text:' labels of 
+the template in a single pass and writes the output once. The output is the 
+same as that of textfill run on the output of tablefill.
+
+Lyxfill must first be imported to make.py.  This is typically achieved by 
+including the following lines:
+
+```
+from gslab_fill.lyxfill import lyxfill
+```
+
+Once the module has been imported, the syntax used to call lyxfill is as follows:
+
+```
+lyxfill(table_input = 'table_input_file(s)', text_input = 'text_input_file(s)', 
+        template = 'template_file', output = 'output_file', 
+        [size = 'size'], [remove_echoes = 'True/False'], [prefix = 'prefix'])
+```
+
+The argument 'table_input' lists the text files containing the tables, as the 
+argument 'input' of tablefill does, and 'text_input' lists the Stata logs, as 
+the argument 'input' of textfill does. Either may be omitted, in which case the 
+corresponding labels are left as they are. The optional arguments 'size', 
+'remove_echoes' and 'prefix' are those of textfill.
+
+See the docstrings of tablefill and textfill for the formats of the input files 
+and of the labels in the template.
+
+
+######################
+# Error Logging
+######################
+
+As with tablefill and textfill, lyxfill returns a message describing either its 
+success or the error that occurred, including a traceback:
+
+```
+exitmessage = lyxfill(table_input = 'table_input_file(s)', text_input = 'text_input_file(s)', 
+                      template = 'template_file', output = 'output_file')
+```
+'''
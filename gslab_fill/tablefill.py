@@ -1,33 +1,115 @@
 #! /usr/bin/env python
 
 import os
-import argparse
 import types
 import re
 import traceback
+import hashlib
+import cPickle
 import tablefill_info
-from decimal import Decimal, ROUND_HALF_UP
+from _output import write_if_changed
+from decimal import Decimal, ROUND_HALF_UP, getcontext
+
+tab_label = re.compile('<Tab:', flags = re.IGNORECASE)
+numeric_placeholder = re.compile(r'#\d+,?#')
+comma_placeholder = re.compile(r'#\d+,#')
+plain_decimal = re.compile(r'(-?)(\d+)(?:\.(\d*))?$')
+
+# Quantizers and their number of decimal places, by entry tag
+quantizers = {}
+
+# Version of the compiled templates stored by load_template. Increment it whenever
+# the output of scan_template changes so that stale caches are not used.
+template_cache_version = 1
 
 
 def tablefill(**kwargs):
     try:
         args = parse_arguments(kwargs)
-        tables = parse_tables(args)
-        lyx_text = insert_tables(args, tables)
-        lyx_text = insert_warning(args, lyx_text)
-        write_to_lyx(args, lyx_text)
-        exitmessage = args['template'] + ' filled successfully by tablefill'
-        print exitmessage
-        return exitmessage	
+        lyx_text, labels = load_template(args['template'], args['cache'])
+        tables = parse_tables(args, set(label[0] for label in labels))
+        return fill_template(args, lyx_text, labels, tables)
     except:
-        print 'Error Found'
-        exitmessage = traceback.format_exc()
-        print exitmessage
-        return exitmessage
+        return report_error()
 
 # Set tablefill's docstring as the text in "tablefill_info.py"
 tablefill.__doc__ = tablefill_info.__doc__   
 
+
+def tablefill_batch(**kwargs):
+    '''
+    Fill each (template, output) pair in `jobs` with the tables in `input`, which 
+    are read and parsed only once. The optional argument `processes` sets the 
+    number of processes that fill templates in parallel, and `cache` is passed on
+    as in tablefill. Returns the exit message of each job in the order of jobs.
+    '''
+    try:
+        args = parse_arguments(kwargs)
+        jobs = list(kwargs['jobs'])
+        processes = kwargs.get('processes', 1)
+        tasks = []
+        for template, output in jobs:
+            job_args = dict(args, template = template, output = output)
+            try:
+                tasks.append((job_args, load_template(template, args['cache'])))
+            except:
+                tasks.append((job_args, report_error()))
+        tags = set(label[0] for job_args, loaded in tasks if isinstance(loaded, tuple) 
+                            for label in loaded[1])
+        tables = parse_tables(args, tags)
+    except:
+        return [report_error()] * len(kwargs.get('jobs', []))
+    
+    if processes > 1 and len(tasks) > 1:
+        # Imported here as it is slow to import and only needed to fill in parallel
+        import multiprocessing
+        # The tables are sent to each process once rather than with every job
+        pool = multiprocessing.Pool(min(processes, len(tasks)), _init_worker, (tables, ))
+        try:
+            return pool.map(_fill_worker, tasks, 1)
+        finally:
+            pool.close()
+            pool.join()
+    
+    _init_worker(tables)
+    try:
+        return [_fill_worker(task) for task in tasks]
+    finally:
+        _init_worker(None)
+
+
+def _init_worker(tables):
+    global _worker_tables
+    _worker_tables = tables
+
+def _fill_worker(task):
+    args, loaded = task
+    if not isinstance(loaded, tuple):
+        return loaded
+    try:
+        return fill_template(args, loaded[0], loaded[1], _worker_tables)
+    except:
+        return report_error()
+
+
+def fill_template(args, lyx_text, labels, tables):
+    lyx_text = fill_tables(lyx_text, labels, tables)
+    lyx_text = insert_warning(args, lyx_text)
+    changed = write_to_lyx(args, lyx_text)
+    exitmessage = args['template'] + ' filled successfully by tablefill'
+    if not changed:
+        exitmessage += ' (%s unchanged)' % args['output']
+    print exitmessage
+    return exitmessage
+
+
+def report_error():
+    print 'Error Found'
+    exitmessage = traceback.format_exc()
+    print exitmessage
+    return exitmessage
+
+
 def parse_arguments(kwargs):
     args = dict()
     if 'input' in kwargs.keys():
@@ -37,104 +119,358 @@ def parse_arguments(kwargs):
         args['template'] = kwargs['template']
     if 'output' in kwargs.keys():
         args['output'] = kwargs['output']        
+    if 'cache' in kwargs.keys():
+        args['cache'] = kwargs['cache']
+    else:
+        args['cache'] = None
     
     return args
 
 
-def parse_tables(args):
-    data   = read_data(args['input'])
-    tables = parse_data(data)
+def parse_tables(args, tags = None):
+    '''
+    Return the entries of the tables in the input files by table tag, as parse_data 
+    does. Input files ending in .json or .npz are read by read_json or read_npz, 
+    and consecutive other input files as one stream of tab-delimited text.
+    '''
+    tables = {}
+    text_files = []
+    for file in args['input']:
+        reader = structured_readers.get(os.path.splitext(file)[1].lower())
+        if reader is None:
+            text_files.append(file)
+        else:
+            if text_files:
+                tables.update(parse_data(read_data(text_files), tags))
+                text_files = []
+            tables.update(reader(file, tags))
+    if text_files:
+        tables.update(parse_data(read_data(text_files), tags))
+    
+    return tables
+
+
+def read_json(file, tags = None):
+    '''
+    Return the tables of a JSON object mapping each table tag to its entries, either 
+    as a list or as a list of rows. Numbers are kept exactly as written, and null,
+    NaN, "" and "." entries are treated as missing, as NaN entries of .npz files are.
+    '''
+    import json
+    with open(file, 'rb') as infile:
+        data = json.load(infile, parse_float = str, parse_int = str, 
+                         parse_constant = json_constants.get)
+    tables = {}
+    for tag, entries in data.items():
+        tag = tag.encode('utf-8').lower()
+        if tags is None or tag in tags:
+            try:
+                if not isinstance(entries, list):
+                    raise TypeError('entries must be a list, not %r' % (entries, ))
+                tables[tag] = flatten_entries(entries)
+            except TypeError as error:
+                raise TypeError('Table %s of %s: %s' % (tag, file, error))
+    
+    return tables
+
+
+def flatten_entries(entries, flat = None):
+    '''
+    Append the entries of a nested list of JSON values to flat in row-major order
+    and return it. Missing entries are left out. Raises TypeError for entries that
+    are neither numbers, strings, null nor lists.
+    '''
+    if flat is None:
+        flat = []
+    append = flat.append
+    for entry in entries:
+        # Numbers are read as str and strings as unicode
+        if entry.__class__ is str:
+            append(entry)
+        elif isinstance(entry, list):
+            flatten_entries(entry, flat)
+        elif isinstance(entry, unicode):
+            entry = entry.encode('utf-8').strip()
+            if entry != '.' and entry != '':
+                append(entry)
+        elif entry is not None:
+            raise TypeError('entries must be numbers, strings or null, not %r' % (entry, ))
+    
+    return flat
+
+
+def read_npz(file, tags = None):
+    '''
+    Return the tables of a NumPy .npz file holding an array for each table tag. The
+    entries of each array are read in row-major order, and NaN entries are treated 
+    as missing. Floats are written with the fewest digits that represent them exactly.
+    '''
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('Reading %s requires NumPy' % file)
+    tables = {}
+    with numpy.load(file) as data:
+        for tag in data.files:
+            if tags is None or tag.lower() in tags:
+                entries = [entry_string(entry) for entry in data[tag].ravel().tolist() 
+                           if entry == entry]
+                tables[tag.lower()] = [entry for entry in entries if entry != '.' and entry != '']
     
     return tables
 
 
+def entry_string(entry):
+    if isinstance(entry, float):
+        return repr(entry)
+    elif isinstance(entry, unicode):
+        return entry.encode('utf-8').strip()
+    
+    return str(entry).strip()
+
+
+structured_readers = {'.json': read_json, '.npz': read_npz}
+
+# Values of the constants JSON allows for numbers, written as read_npz writes them.
+# NaN is None, i.e. missing.
+json_constants = {'Infinity': repr(float('inf')), '-Infinity': repr(float('-inf'))}
+
+
 def read_data(input):
-    data = []
+    '''
+    Yield the lines of each input file in turn.
+    '''
     if isinstance(input, types.StringTypes):
         input = [input]
     for file in input:
-        data += open(file, 'rU').readlines()
-    
-    return data
+        with open(file, 'rU') as infile:
+            for line in infile:
+                yield line
 
 
-def parse_data(data):
+def parse_data(data, tags = None):
+    '''
+    Return the entries of each table in the lines of data by table tag. If tags
+    is given, the entries of tables whose tag is not in tags are not kept.
+    '''
     tables = {}
     for row in data:
-        if re.match('^<Tab:', row, flags = re.IGNORECASE):
-            tag = re.sub('<Tab:', '', row, flags = re.IGNORECASE)
-            tag = re.sub('>\n', '', tag, flags = re.IGNORECASE)
-            tag = tag.lower()
-            tables[tag] = []
-        else:
-            clean_row = row.strip()
-            tables[tag] = tables[tag] + clean_row.split('\t')
-    for table_tag in tables:
-        for n in range( len(tables[table_tag]) ):
-            clean_entry = tables[table_tag][n].strip()
-            tables[table_tag][n] = clean_entry
-        tables[table_tag] = filter(lambda a: a != '.' and a != '', tables[table_tag])
+        if tab_label.match(row):
+            tag = tab_label.sub('', row).replace('>\n', '').lower()
+            if tags is None or tag in tags:
+                table = tables[tag] = []
+            else:
+                table = None
+        elif table is not None:
+            for entry in row.split('\t'):
+                entry = entry.strip()
+                if entry != '.' and entry != '':
+                    table.append(entry)
         
     return tables    
     
 
-def insert_tables(args,tables):
-    lyx_text = open(args['template'], 'rU').readlines()
-    for n in range( len(lyx_text) ):
-        if lyx_text[n].startswith('name "tab:'):
-            tag = lyx_text[n].replace('name "tab:','').rstrip('"\n').lower()
-            if tag in tables:
-                i = n
-                entry_count = 0
-                search_table = True
-                
-                while search_table is True:
-                    i+=1
-                    
-                    if re.match('^.*###', lyx_text[i]):
-                        lyx_text[i] = lyx_text[i].replace('###', tables[tag][entry_count])
-                        entry_count+=1
-                        
-                    elif re.match('^.*#\d+#', lyx_text[i]) or re.match('^.*#\d+,#', lyx_text[i]):
-                        entry_tag = re.split('#', lyx_text[i])[1]
-                        if re.match('---', tables[tag][entry_count]):
-                            rounded_entry = '---'
-                        else:
-                            rounded_entry = round_entry(entry_tag, tables[tag][entry_count])
-                            if re.match('^.*#\d+,#', lyx_text[i]):
-                                rounded_entry = insert_commas(rounded_entry)
-                        lyx_text[i] = lyx_text[i].replace('#' + entry_tag + '#', rounded_entry)
-                        entry_count+=1
-                        
-                    elif lyx_text[i]=='</lyxtabular>\n':
-                        search_table = False
+def insert_tables(args, tables):
+    lyx_text, labels = load_template(args['template'], args.get('cache'))
+    lyx_text = fill_tables(lyx_text, labels, tables)
     
     return lyx_text
- 
+
+
+def load_template(template, cache = None):
+    '''
+    Return the lines of template and their labels as found by scan_template.
+    If cache is a directory, the result is stored there and reused for as long as 
+    the modification time and size of template are unchanged.
+    '''
+    if cache:
+        stat = os.stat(template)
+        key = (template_cache_version, stat.st_mtime, stat.st_size)
+        cache_file = os.path.join(cache, hashlib.sha1(os.path.abspath(template)).hexdigest())
+        try:
+            with open(cache_file, 'rb') as compiled:
+                cached_key, lyx_text, labels = cPickle.load(compiled)
+            if cached_key == key:
+                return lyx_text, labels
+        except Exception:
+            pass
+    
+    with open(template, 'rU') as infile:
+        lyx_text = infile.readlines()
+    labels = scan_template(lyx_text)
+    
+    if cache:
+        # Write to a temporary file first so that concurrent builds never read a partial cache
+        temp_file = '%s.%d' % (cache_file, os.getpid())
+        try:
+            if not os.path.isdir(cache):
+                os.makedirs(cache)
+            with open(temp_file, 'wb') as compiled:
+                cPickle.dump((key, lyx_text, labels), compiled, cPickle.HIGHEST_PROTOCOL)
+            try:
+                os.rename(temp_file, cache_file)
+            except OSError:
+                # os.rename does not replace existing files on Windows
+                os.remove(cache_file)
+                os.rename(temp_file, cache_file)
+        except (IOError, OSError):
+            # The template was read, so carry on without caching it, e.g. on a full disk
+            if os.path.isfile(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+    
+    return lyx_text, labels
+
+
+def scan_template(lyx_text, text_labels = None):
+    '''
+    Find the placeholders of every table labelled in lyx_text in a single pass. 
+    Returns a list with a (tag, placeholders, terminated) tuple for each label, where
+    placeholders lists the (line number, entry tag, commas) of each placeholder in 
+    the table following the label, in order. The entry tag is None for ### 
+    placeholders, and terminated is False if the table has no </lyxtabular> line.
+    
+    If text_labels is a list, the same pass appends to it a (tag, label line, end line)
+    tuple for each textfill label, where end line is the number of the first 
+    \end_layout line after the label, or None if there is none.
+    '''
+    labels = []
+    active = []
+    pending = []
+    for n, line in enumerate(lyx_text):
+        if active:
+            if '###' in line:
+                placeholder = (n, None, False)
+            elif numeric_placeholder.search(line):
+                placeholder = (n, line.split('#')[1], bool(comma_placeholder.search(line)))
+            elif line == '</lyxtabular>\n':
+                for label in active:
+                    label[2] = True
+                active = []
+                placeholder = None
+            else:
+                placeholder = None
+            if placeholder:
+                for label in active:
+                    label[1].append(placeholder)
+        if line.startswith('name "tab:'):
+            tag = line.replace('name "tab:', '').rstrip('"\n').lower()
+            active.append([tag, [], False])
+            labels.append(active[-1])
+        elif text_labels is not None:
+            if line.startswith('name "text:'):
+                pending.append((line.replace('name "text:', '', 1).rstrip('"\n').lower(), n))
+            elif pending and line == '\\end_layout\n':
+                text_labels.extend((tag, label_line, n) for tag, label_line in pending)
+                pending = []
+    
+    if text_labels is not None:
+        text_labels.extend((tag, label_line, None) for tag, label_line in pending)
+    
+    return [tuple(label) for label in labels]
+
+
+def fill_tables(lyx_text, labels, tables):
+    '''
+    Fill the placeholders found by scan_template with the entries of tables.
+    A line filled for one table is skipped by tables whose labels precede it.
+    '''
+    lyx_text = list(lyx_text)
+    filled = set()
+    for tag, placeholders, terminated in labels:
+        if tag in tables:
+            if not terminated:
+                raise IndexError('Table %s has no </lyxtabular> line' % tag)
+            entries = tables[tag]
+            cells = []
+            for n, entry_tag, commas in placeholders:
+                if n in filled:
+                    continue
+                cells.append((n, entry_tag, commas, entries[len(cells)]))
+                filled.add(n)
+            formatted = format_entries([cell[1:] for cell in cells])
+            for (n, entry_tag, commas, entry), formatted_entry in zip(cells, formatted):
+                if entry_tag is None:
+                    lyx_text[n] = lyx_text[n].replace('###', formatted_entry)
+                else:
+                    lyx_text[n] = lyx_text[n].replace('#' + entry_tag + '#', formatted_entry)
+    
+    return lyx_text
+
+
+def format_entries(cells):
+    '''
+    Format the (entry tag, commas, entry) of each cell of a table as fill_tables
+    inserts it. Entries of ### placeholders, whose entry tag is None, are unchanged.
+    '''
+    formatted = []
+    for entry_tag, commas, entry in cells:
+        if entry_tag is None:
+            formatted.append(entry)
+        elif entry.startswith('---'):
+            formatted.append('---')
+        elif commas:
+            formatted.append(insert_commas(round_entry(entry_tag, entry)))
+        else:
+            formatted.append(round_entry(entry_tag, entry))
+    
+    return formatted
+
 
 def round_entry(entry_tag, entry):
+    try:
+        quantizer, places = quantizers[entry_tag]
+    except KeyError:
+        quantizer, places = quantizers[entry_tag] = get_quantizer(entry_tag)
+    
+    # Round plain decimals as strings, which is much faster than Decimal.quantize 
+    # and gives the same result. Anything else, and results that Decimal would
+    # reject or print in scientific notation, are left to Decimal.
+    match = plain_decimal.match(entry)
+    if match:
+        sign, integer_part, decimal_part = match.groups()
+        decimal_part = decimal_part or ''
+        if len(decimal_part) <= places:
+            coefficient = int(integer_part + decimal_part.ljust(places, '0'))
+        else:
+            coefficient = int(integer_part + decimal_part[:places])
+            if decimal_part[places] >= '5':
+                coefficient += 1
+        digits = str(coefficient)
+        # Decimal switches to scientific notation below an adjusted exponent of -6
+        if len(digits) <= getcontext().prec and len(digits) - 1 - places >= -6:
+            if places:
+                digits = digits.rjust(places + 1, '0')
+                return sign + digits[:-places] + '.' + digits[-places:]
+            return sign + digits
+    
+    return str(Decimal(entry).quantize(quantizer, rounding = ROUND_HALF_UP))
+
+
+def get_quantizer(entry_tag):
+    '''
+    Return the quantizer with which round_entry rounds to entry_tag and its number
+    of decimal places.
+    '''
     round_to = int(entry_tag.replace(',', ''))
     decimal_place = round(pow(0.1, round_to), round_to)
     if round_to == 0:
         decimal_place = str(int(decimal_place))
     else:
         decimal_place = str(decimal_place)
-    rounded_entry = str(Decimal(entry).quantize(Decimal(decimal_place), rounding = ROUND_HALF_UP))
-
-    return rounded_entry
+    quantizer = Decimal(decimal_place)
+    
+    return quantizer, -quantizer.as_tuple().exponent
 
 
 def insert_commas(entry):
-    integer_part = re.split('\.', entry)[0]
-    integer_part = format(int(integer_part), ',d')
+    integer_part, point, decimal_part = entry.partition('.')
+    entry_commas = format(int(integer_part), ',d') + point + decimal_part.split('.')[0]
     
-    if re.search('\.', entry):
-        decimal_part = re.split('\.', entry)[1]
-        entry_commas = integer_part + '.' + decimal_part 
-    else:
-        entry_commas = integer_part
-
-    if float(entry) < 0 and entry_commas[0] != '-':
+    # A negative entry loses its sign when its integer part is -0
+    if entry_commas[0] != '-' and '-' in integer_part and float(entry) < 0:
         entry_commas = '-' + entry_commas
     
     return entry_commas
@@ -163,7 +499,5 @@ def insert_warning(args, lyx_text):
     
 
 def write_to_lyx(args, lyx_text):    
-    outfile = open(args['output'], 'wb')
-    outfile.write( ''.join(lyx_text) )
-    outfile.close()
+    return write_if_changed(args['output'], lyx_text)
     
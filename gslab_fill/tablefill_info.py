@@ -34,6 +34,37 @@ input text files, they are listed as: input = 'input_file_1 input_file_2'.
 The argument 'output' is the name of the filled LyX file to be produced.  
 Note that this file is created by tablefill.py and should not be edited 
 manually by the user.
+If the output file already exists with exactly the content tablefill 
+produces, it is not rewritten, so that its modification time is kept, and the 
+message tablefill returns notes that the output is unchanged.
+
+The optional argument 'cache' names a directory in which tablefill stores a 
+compiled copy of each template, i.e. the positions of its tables' cells:
+
+```
+tablefill(input = 'input_file(s)', template = 'template_file', 
+          output = 'output_file', cache = 'cache_directory')
+```
+
+When the same template is filled again and has not been modified since, 
+tablefill reads the compiled copy instead of searching the template for 
+cells. The directory is created if it does not exist and may be deleted at
+any time.
+
+To fill several templates with the same input files, use tablefill_batch, 
+which reads and parses the input files only once:
+
+```
+from gslab_fill.tablefill import tablefill_batch
+tablefill_batch(input = 'input_file(s)', 
+                jobs = [('template_file_1', 'output_file_1'),
+                        ('template_file_2', 'output_file_2')],
+                processes = 2)
+```
+
+The optional argument 'processes' sets the number of processes that fill the 
+templates in parallel (by default 1). tablefill_batch also accepts 'cache', 
+and returns a list with the message tablefill would return for each template.
 
 ###########################
 Input File Format:
@@ -84,6 +115,27 @@ is equivalent to:
 This feature is useful as Stata outputs missing values in numerical 
 variables as ".", and missing values in string variables as "[space]".
 
+................................
+ Structured Input Files:
+................................
+Input files ending in .json or .npz are read as structured inputs rather than 
+as text, and may be mixed with text input files.
+
+A .json file holds an object mapping each table label, without "tab:", to its 
+entries, either as a list or as a list of rows. Numbers are filled exactly as 
+written in the file, and null, NaN, "" and "." entries are treated as missing. 
+Infinity is filled as inf. Entries that are true, false or objects are errors:
+
+```
+{"Test": [[1, 2, 3], [2, null, 1, 3], [3, 1, 2]], 
+ "FunnyMat": [1, 2.50, "---"]}
+```
+
+A .npz file, as written by NumPy's savez, holds an array for each table label. 
+Its entries are read in row-major order, and NaN entries are treated as 
+missing. Floats are filled from the shortest string that represents them 
+exactly. Reading .npz files requires NumPy.
+
 ................................
  Scientific Notation Notes:
 ................................
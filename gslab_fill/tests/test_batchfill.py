@@ -0,0 +1,73 @@
+#! /usr/bin/env python
+
+import unittest
+import sys
+import os
+import json
+import shutil
+
+sys.path.append('../..')
+
+from gslab_fill import batchfill, tablefill, textfill, lyxfill
+from gslab_make.tests import nostderrout
+
+
+class testBatchfill(unittest.TestCase):
+
+    def setUp(self):
+        if not os.path.exists('./build/'):
+            os.mkdir('./build/')
+        self.table_input = '../../gslab_fill/tests/input/tables_appendix.txt ' + \
+                           '../../gslab_fill/tests/input/tables_appendix_two.txt'
+        self.text_input  = '../../gslab_fill/tests/input/legal.log'
+        self.table_template = '../../gslab_fill/tests/input/tablefill_template.lyx'
+        self.text_template  = '../../gslab_fill/tests/input/textfill_template.lyx'
+        self.manifest = [{'template': self.table_template, 'input': self.table_input,
+                          'output': './build/tables.lyx'},
+                         {'type': 'textfill', 'template': self.text_template, 
+                          'input': self.text_input, 'output': './build/text.lyx', 
+                          'remove_echoes': True},
+                         {'type': 'lyxfill', 'template': self.text_template, 
+                          'table_input': self.table_input, 'text_input': self.text_input, 
+                          'output': './build/both.lyx'},
+                         {'type': 'otherfill', 'template': self.text_template, 
+                          'output': './build/other.lyx'},
+                         {'template': self.table_template, 'output': './build/missing.lyx',
+                          'input': '../../gslab_fill/tests/input/fake_file.txt'}]
+
+    def testBatchfill(self):
+        with nostderrout():
+            tablefill(input = self.table_input, template = self.table_template, 
+                      output = './build/tables_expected.lyx')
+            textfill(input = self.text_input, template = self.text_template, 
+                     output = './build/text_expected.lyx', remove_echoes = True)
+            lyxfill(table_input = self.table_input, text_input = self.text_input, 
+                    template = self.text_template, output = './build/both_expected.lyx')
+        
+        with open('./build/manifest.json', 'wb') as manifest:
+            json.dump(self.manifest, manifest)
+        for manifest, processes in [(self.manifest, 1), ('./build/manifest.json', 2)]:
+            with nostderrout():
+                results, timings = batchfill(manifest, processes)
+            self.assertEqual([result[0] for result in results], 
+                             [job['output'] for job in self.manifest])
+            for output, message, seconds in results[:3]:
+                self.assertIn('filled successfully', message)
+                self.assertEqual(open(output, 'rU').read(), 
+                                 open(output.replace('.lyx', '_expected.lyx'), 'rU').read())
+                os.remove(output)
+            self.assertIn('ValueError', results[3][1])
+            self.assertIn('IOError', results[4][1])
+            
+            # The inputs shared by the first and third jobs are parsed once
+            self.assertEqual(sorted(timing[0] for timing in timings), 
+                             ['../../gslab_fill/tests/input/fake_file.txt',
+                              self.text_input, self.text_input, self.table_input])
+
+    def tearDown(self):
+        if os.path.exists('./build/'):
+            shutil.rmtree('./build/')
+
+
+if __name__ == '__main__':
+    unittest.main()
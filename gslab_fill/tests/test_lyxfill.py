@@ -0,0 +1,94 @@
+#! /usr/bin/env python
+
+import unittest
+import sys
+import os
+import shutil
+
+sys.path.append('../..')
+
+from gslab_fill import lyxfill, tablefill, textfill
+from gslab_fill.tablefill import scan_template
+from gslab_make.tests import nostderrout
+
+
+class testLyxfill(unittest.TestCase):
+
+    def setUp(self):
+        if not os.path.exists('./build/'):
+            os.mkdir('./build/')
+        self.table_input = '../../gslab_fill/tests/input/tables_appendix.txt ' + \
+                           '../../gslab_fill/tests/input/tables_appendix_two.txt'
+        self.text_input  = '../../gslab_fill/tests/input/legal.log'
+        
+        # Combine the bodies of the tablefill and textfill templates
+        table_lines = open('../../gslab_fill/tests/input/tablefill_template.lyx', 'rU').readlines()
+        text_lines  = open('../../gslab_fill/tests/input/textfill_template.lyx', 'rU').readlines()
+        text_body = text_lines[text_lines.index('\\begin_body\n') + 1:text_lines.index('\\end_body\n')]
+        end_body = table_lines.index('\\end_body\n')
+        with open('./build/template.lyx', 'wb') as template:
+            template.write(''.join(table_lines[:end_body] + text_body + table_lines[end_body:]))
+
+    def testInput(self):
+        with nostderrout():
+            tablefill(input = self.table_input, template = './build/template.lyx',
+                      output = './build/tables.lyx')
+            textfill(input = self.text_input, template = './build/tables.lyx', 
+                     output = './build/expected.lyx', size = 'small')
+            message = lyxfill(table_input = self.table_input, text_input = self.text_input,
+                              template = './build/template.lyx', output = './build/filled.lyx',
+                              size = 'small')
+        self.assertIn('filled successfully by lyxfill', message)
+        self.assertIn('begin{verbatim}', open('./build/expected.lyx', 'rU').read())
+        self.assertEqual(open('./build/filled.lyx', 'rU').read(), 
+                         open('./build/expected.lyx', 'rU').read())
+
+    def testSingleInput(self):
+        with nostderrout():
+            tablefill(input = self.table_input, template = './build/template.lyx',
+                      output = './build/expected.lyx')
+            message = lyxfill(table_input = self.table_input, template = './build/template.lyx', 
+                              output = './build/filled.lyx')
+        self.assertIn('filled successfully by lyxfill', message)
+        self.assertEqual(open('./build/filled.lyx', 'rU').read(), 
+                         open('./build/expected.lyx', 'rU').read())
+        
+        with nostderrout():
+            textfill(input = self.text_input, template = './build/template.lyx', 
+                     output = './build/expected.lyx', remove_echoes = True)
+            message = lyxfill(text_input = self.text_input, template = './build/template.lyx', 
+                              output = './build/filled.lyx', remove_echoes = True)
+        self.assertIn('filled successfully by lyxfill', message)
+        self.assertEqual(open('./build/filled.lyx', 'rU').read(), 
+                         open('./build/expected.lyx', 'rU').read())
+
+    def testScanTextLabels(self):
+        lyx_text = ['name "text:zero"\n', 'name "tab:table"\n', '###\n', 'name "text:First"\n', 
+                    'name "text:second"\n', '\\end_layout\n', '</lyxtabular>\n', '\\end_layout\n',
+                    'name "text:third"\n']
+        text_labels = []
+        labels = scan_template(lyx_text, text_labels)
+        self.assertEqual(labels, scan_template(lyx_text))
+        self.assertEqual(text_labels, [('zero', 0, 5), ('first', 3, 5), ('second', 4, 5), 
+                                       ('third', 8, None)])
+
+    def testErrors(self):
+        with open('./build/template.lyx', 'ab') as template:
+            template.write('name "text:test_small"\n')
+        with nostderrout():
+            error = lyxfill(table_input = self.table_input, text_input = self.text_input,
+                            template = './build/template.lyx', output = './build/filled.lyx')
+        self.assertIn('IndexError', error)
+        
+        with nostderrout():
+            error = lyxfill(text_input = '../../gslab_fill/tests/input/tags_not_closed.log', 
+                            template = './build/template.lyx', output = './build/filled.lyx')
+        self.assertIn('HTMLParseError', error)
+
+    def tearDown(self):
+        if os.path.exists('./build/'):
+            shutil.rmtree('./build/')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,14 +5,23 @@ import sys
 import os
 import re
 import decimal
+import json
+import random
 import shutil
 from subprocess import check_call, CalledProcessError
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # Ensure that Python can find and load the GSLab libraries
 #os.chdir(os.path.dirname(os.path.realpath(__file__)))
 sys.path.append('../..')
 
-from gslab_fill import tablefill
+from gslab_fill import tablefill, tablefill_batch
+from gslab_fill.tablefill import (parse_data, parse_tables, scan_template, fill_tables, 
+                                  format_entries, round_entry, insert_commas)
 from gslab_make.tests import nostderrout
 
 
@@ -109,11 +118,277 @@ class testTablefill(unittest.TestCase):
 
         self.assertEqual(filled_data_args1, filled_data_args2)
         
+    def testUnchangedOutput(self):
+        kwargs = {'input':    '../../gslab_fill/tests/input/tables_appendix.txt ' + \
+                              '../../gslab_fill/tests/input/tables_appendix_two.txt', 
+                  'template': '../../gslab_fill/tests/input/tablefill_template.lyx',
+                  'output':   './build/tablefill_template_filled.lyx'}
+        with nostderrout():
+            message = tablefill(**kwargs)
+        os.utime(kwargs['output'], (0, 0))
+        with nostderrout():
+            message = tablefill(**kwargs)
+        self.assertIn('filled successfully', message)
+        self.assertIn('unchanged', message)
+        self.assertEqual(os.path.getmtime(kwargs['output']), 0)
+        
+        kwargs['input'] = '../../gslab_fill/tests/input/tables_appendix.txt'
+        with nostderrout():
+            message = tablefill(**kwargs)
+        self.assertNotIn('unchanged', message)
+        self.assertNotEqual(os.path.getmtime(kwargs['output']), 0)
+        
+    @unittest.skipIf(not hasattr(os, 'symlink'), 'Symbolic links are not supported')
+    def testSymlinkedOutput(self):
+        with open('./build/tablefill_template_real.lyx', 'wb') as real:
+            real.write('stale')
+        os.chmod('./build/tablefill_template_real.lyx', 0600)
+        os.symlink('tablefill_template_real.lyx', './build/tablefill_template_link.lyx')
+        kwargs = {'input':    '../../gslab_fill/tests/input/tables_appendix.txt ' + \
+                              '../../gslab_fill/tests/input/tables_appendix_two.txt', 
+                  'template': '../../gslab_fill/tests/input/tablefill_template.lyx',
+                  'output':   './build/tablefill_template_link.lyx'}
+        with nostderrout():
+            message = tablefill(**kwargs)
+        self.assertIn('filled successfully', message)
+        self.assertTrue(os.path.islink(kwargs['output']))
+        self.assertEqual(os.stat('./build/tablefill_template_real.lyx').st_mode & 0777, 0600)
+        with open('./build/tablefill_template_real.lyx', 'rb') as real:
+            self.assertIn('\\begin_layout', real.read())
+        
+        with nostderrout():
+            message = tablefill(**kwargs)
+        self.assertIn('unchanged', message)
+        self.assertTrue(os.path.islink(kwargs['output']))
+        
+    def testParseData(self):
+        data = ['<Tab:First>\n', '  1.5\t.\t\t-2 \n', '\t3\n', 
+                '<tab:second>\n', '.\t---\n', '<TAB:third>']
+        tables = parse_data(data)
+        self.assertEqual(tables, {'first': ['1.5', '-2', '3'], 'second': ['---'], 'third>': []})
+        
+        data.append('<Tab:first>\n')
+        self.assertEqual(parse_data(data)['first'], [])
+        
+        data = ['<Tab:large>\n'] + ['1.0\t2.0\t.\t3.0\n'] * 100000
+        self.assertEqual(len(parse_data(data)['large']), 300000)
+        
+        data = iter(['<Tab:used>\n', '1\n', '<Tab:unused>\n', '2\t3\n', '<Tab:USED>\n', '4\n'])
+        self.assertEqual(parse_data(data, set(['used', 'other'])), {'used': ['4']})
+    
+    def testJsonInput(self):
+        text_input = '../../gslab_fill/tests/input/tables_appendix.txt'
+        tables = parse_tables({'input': [text_input]})
+        with open('./build/tables.json', 'wb') as json_file:
+            json.dump(dict((tag.upper(), [entries[:5], entries[5:]]) for tag, entries in tables.items()), 
+                      json_file)
+        self.assertEqual(parse_tables({'input': ['./build/tables.json']}), tables)
+        
+        for input in [text_input, './build/tables.json']:
+            with nostderrout():
+                message = tablefill(input    = input + ' ' + \
+                                               '../../gslab_fill/tests/input/tables_appendix_two.txt', 
+                                    template = '../../gslab_fill/tests/input/tablefill_template.lyx', 
+                                    output   = './build/tablefill_template_filled.lyx')
+            self.assertIn('filled successfully', message)
+            with open('./build/tablefill_template_filled.lyx', 'rU') as filled_file:
+                filled_data = filled_file.read().replace(input, '')
+            if input == text_input:
+                text_filled_data = filled_data
+        self.assertEqual(filled_data, text_filled_data)
+        
+        with open('./build/tables.json', 'wb') as json_file:
+            json_file.write('{"first": [1.50, -2, [null, " . ", "", 3e5]], "second": ["---", "\\u00e9"],'
+                            ' "unobservables": [1]}')
+        tables = parse_tables({'input': ['./build/tables.json', 
+                                         '../../gslab_fill/tests/input/tables_appendix_two.txt']},
+                              set(['first', 'second', 'unobservables']))
+        self.assertEqual(tables['first'], ['1.50', '-2', '3e5'])
+        self.assertEqual(tables['second'], ['---', '\xc3\xa9'])
+        self.assertEqual(sorted(tables.keys()), ['first', 'second', 'unobservables'])
+        self.assertNotEqual(tables['unobservables'], ['1'])
+        
+        with open('./build/tables.json', 'wb') as json_file:
+            json_file.write('{"first": [NaN, 1, -Infinity, [Infinity, NaN]]}')
+        self.assertEqual(parse_tables({'input': ['./build/tables.json']})['first'], ['1', '-inf', 'inf'])
+        for entries in ['[1, true]', '[{"a": 1}]', '[[1], false]', '1', '{"a": [1]}']:
+            with open('./build/tables.json', 'wb') as json_file:
+                json_file.write('{"first": %s}' % entries)
+            with self.assertRaisesRegexp(TypeError, 'Table first of ./build/tables.json'):
+                parse_tables({'input': ['./build/tables.json']})
+    
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def testNpzInput(self):
+        numpy.savez('./build/tables.npz', First = numpy.array([[1.5, numpy.nan], [0.1, -2e20]]),
+                    second = numpy.array(['---', ' . ', '1']), third = numpy.arange(3))
+        tables = parse_tables({'input': ['./build/tables.npz']}, set(['first', 'second']))
+        self.assertEqual(tables, {'first': ['1.5', '0.1', '-2e+20'], 'second': ['---', '1']})
+    
+    def testScanTemplate(self):
+        lyx_text = ['name "tab:First"\n', '###\n', 'text\n', '(#2,#)\n', '</lyxtabular>\n',
+                    '#1#\n', 'name "tab:second"\n', '#0# and #0#\n', '</lyxtabular>\n',
+                    'name "tab:unused"\n', '###\n']
+        labels = scan_template(lyx_text)
+        self.assertEqual(labels, [('first', [(1, None, False), (3, '2,', True)], True),
+                                  ('second', [(7, '0', False)], True),
+                                  ('unused', [(10, None, False)], False)])
+        
+        tables = {'first': ['a', '-1234.567'], 'second': ['2.5']}
+        filled = fill_tables(lyx_text, labels, tables)
+        self.assertEqual(filled[:9], ['name "tab:First"\n', 'a\n', 'text\n', '(-1,234.57)\n', 
+                                      '</lyxtabular>\n', '#1#\n', 'name "tab:second"\n', 
+                                      '3 and 3\n', '</lyxtabular>\n'])
+        self.assertEqual(filled[10], '###\n')
+        
+        with self.assertRaises(IndexError):
+            fill_tables(lyx_text, labels, {'unused': ['a']})
+    
+    def testScanNestedLabel(self):
+        lyx_text = ['name "tab:outer"\n', '###\n', 'name "tab:inner"\n', '###\n', '#1#\n',
+                    '</lyxtabular>\n']
+        labels = scan_template(lyx_text)
+        
+        filled = fill_tables(lyx_text, labels, {'outer': ['a', 'b', '3'], 'inner': ['c', '2']})
+        self.assertEqual(filled[1:5], ['a\n', 'name "tab:inner"\n', 'b\n', '3.0\n'])
+        
+        filled = fill_tables(lyx_text, labels, {'inner': ['c', '2']})
+        self.assertEqual(filled[1:5], ['###\n', 'name "tab:inner"\n', 'c\n', '2.0\n'])
+    
+    def testCache(self):
+        shutil.copy('../../gslab_fill/tests/input/tablefill_template.lyx', './build/template.lyx')
+        kwargs = {'input':    '../../gslab_fill/tests/input/tables_appendix.txt ' + \
+                              '../../gslab_fill/tests/input/tables_appendix_two.txt', 
+                  'template': './build/template.lyx',
+                  'output':   './build/tablefill_template_filled.lyx',
+                  'cache':    './build/cache'}
+        with nostderrout():
+            message = tablefill(**kwargs)
+        self.assertIn('filled successfully', message)
+        self.assertEqual(len(os.listdir('./build/cache')), 1)
+        with open('./build/tablefill_template_filled.lyx', 'rU') as filled_file:
+            filled_data = filled_file.read()
+        
+        # A cached template is not scanned again
+        tablefill_module = sys.modules['gslab_fill.tablefill']
+        scan_template = tablefill_module.scan_template
+        tablefill_module.scan_template = None
+        try:
+            with nostderrout():
+                message = tablefill(**kwargs)
+        finally:
+            tablefill_module.scan_template = scan_template
+        self.assertIn('filled successfully', message)
+        with open('./build/tablefill_template_filled.lyx', 'rU') as filled_file:
+            self.assertEqual(filled_file.read(), filled_data)
+        
+        # A modified template is
+        with open('./build/template.lyx', 'ab') as template:
+            template.write('name "tab:extra"\n###\n</lyxtabular>\n')
+        with nostderrout():
+            message = tablefill(**kwargs)
+        with open('./build/tablefill_template_filled.lyx', 'rU') as filled_file:
+            self.assertEqual(filled_file.read(), filled_data + 'name "tab:extra"\n###\n</lyxtabular>\n')
+        
+        # A cache that cannot be written is ignored
+        with open('./build/not_a_directory', 'wb') as not_a_directory:
+            not_a_directory.write('')
+        with nostderrout():
+            message = tablefill(**dict(kwargs, cache = './build/not_a_directory'))
+        self.assertIn('filled successfully', message)
+        with open('./build/tablefill_template_filled.lyx', 'rU') as filled_file:
+            self.assertEqual(filled_file.read(), filled_data + 'name "tab:extra"\n###\n</lyxtabular>\n')
+    
+    def testBatch(self):
+        input = '../../gslab_fill/tests/input/tables_appendix.txt ' + \
+                '../../gslab_fill/tests/input/tables_appendix_two.txt'
+        template = '../../gslab_fill/tests/input/tablefill_template.lyx'
+        with nostderrout():
+            tablefill(input = input, template = template, output = './build/tablefill_template_filled.lyx')
+        with open('./build/tablefill_template_filled.lyx', 'rU') as filled_file:
+            filled_data = filled_file.read()
+        
+        for processes in [1, 2]:
+            jobs = [(template, './build/batch1.lyx'), 
+                    ('../../gslab_fill/tests/input/fake_file.lyx', './build/batch2.lyx'), 
+                    (template, './build/batch3.lyx')]
+            with nostderrout():
+                messages = tablefill_batch(input = input, jobs = jobs, processes = processes)
+            self.assertEqual(len(messages), 3)
+            self.assertIn('filled successfully', messages[0])
+            self.assertIn('IOError', messages[1])
+            self.assertIn('filled successfully', messages[2])
+            for output in ['./build/batch1.lyx', './build/batch3.lyx']:
+                with open(output, 'rU') as filled_file:
+                    self.assertEqual(filled_file.read(), filled_data)
+        
+        with nostderrout():
+            messages = tablefill_batch(input = '../../gslab_fill/tests/input/fake_file.txt', 
+                                       jobs = [(template, './build/batch1.lyx')] * 2)
+        self.assertEqual(len(messages), 2)
+        self.assertIn('IOError', messages[1])
+    
+    def testFormatting(self):
+        entries = ['0', '-0', '0.5', '-0.5', '2.5', '-2.5', '0.0049', '-0.004', '1.', '007.50',
+                   '999.995', '-999.995', '1234567.891', '0.00000001', '0.0000005', '123456789' * 3,
+                   '1e5', '-1.5E-3', '+2.5', '.5', ' 3.25 ', 'abc', 'NaN', '1.2.3', '--1']
+        rng = random.Random(0)
+        for _ in range(2000):
+            entry = str(rng.randint(-10 ** rng.randint(0, 9), 10 ** rng.randint(0, 9)))
+            if rng.random() < 0.8:
+                entry += '.' + str(rng.randint(0, 10 ** rng.randint(0, 10))).zfill(rng.randint(0, 6))
+            entries.append(entry)
+        tags = [str(n) for n in range(13)] + ['2,', '02', '20', '27', '28', '323', '330']
+        
+        for entry_tag in tags:
+            for entry in entries:
+                self.assertEqual(self.outcome(round_entry, entry_tag, entry), 
+                                 self.outcome(legacy_round_entry, entry_tag, entry))
+                try:
+                    rounded = legacy_round_entry(entry_tag, entry)
+                except decimal.InvalidOperation:
+                    continue
+                self.assertEqual(self.outcome(insert_commas, rounded), 
+                                 self.outcome(legacy_insert_commas, rounded))
+        
+        cells = [(None, False, '---'), ('2', False, '---1'), ('2', False, '-1.005'), 
+                 ('0,', True, '-1234.5'), (None, False, '1.23456')]
+        self.assertEqual(format_entries(cells), ['---', '---', '-1.01', '-1,235', '1.23456'])
+
+    def outcome(self, function, *args):
+        try:
+            return function(*args)
+        except Exception as error:
+            return type(error)
+
     def tearDown(self):
         if os.path.exists('./build/'):
             shutil.rmtree('./build/')
 
 
+def legacy_round_entry(entry_tag, entry):
+    round_to = int(entry_tag.replace(',', ''))
+    decimal_place = round(pow(0.1, round_to), round_to)
+    if round_to == 0:
+        decimal_place = str(int(decimal_place))
+    else:
+        decimal_place = str(decimal_place)
+    return str(decimal.Decimal(entry).quantize(decimal.Decimal(decimal_place), 
+                                               rounding = decimal.ROUND_HALF_UP))
+
+
+def legacy_insert_commas(entry):
+    integer_part = re.split('\.', entry)[0]
+    integer_part = format(int(integer_part), ',d')
+    if re.search('\.', entry):
+        decimal_part = re.split('\.', entry)[1]
+        entry_commas = integer_part + '.' + decimal_part 
+    else:
+        entry_commas = integer_part
+    if float(entry) < 0 and entry_commas[0] != '-':
+        entry_commas = '-' + entry_commas
+    return entry_commas
+
+
 if __name__ == '__main__':
     os.getcwd()
     unittest.main()
@@ -8,7 +8,7 @@ import HTMLParser
 import shutil
 
 sys.path.append('../..')
-from gslab_fill.textfill import (textfill, read_text, 
+from gslab_fill.textfill import (textfill, read_text, insert_text, write_data_to_lyx,
                                  remove_trailing_leading_blanklines)
 from gslab_make.tests import nostderrout
 
@@ -130,6 +130,75 @@ class testTextfill(unittest.TestCase):
 
         self.assertIn('filled successfully', message)
         
+    def test_read_text_chunks(self):
+        with open('./build/nested.log', 'wb') as log:
+            log.write('<textfill_a>one\r\n<textfill_b>two &amp; <textfill_a>three</textfill_a>'
+                      ' four</textfill_b> five</textfill_a>\n')
+        logs = ['../../gslab_fill/tests/input/legal.log', './build/nested.log']
+        results = read_text(logs, 'textfill_').results
+        self.assertEqual(results['a'], 'three four five')
+        self.assertEqual(results['b'], 'two  ')
+        
+        textfill_module = sys.modules['gslab_fill.textfill']
+        chunk_size = textfill_module.chunk_size
+        textfill_module.chunk_size = 3
+        try:
+            self.assertEqual(read_text(logs, 'textfill_').results, results)
+        finally:
+            textfill_module.chunk_size = chunk_size
+
+    def test_insert_text(self):
+        with open('./build/template.lyx', 'wb') as template:
+            template.write('name "text:first"\n\\end_layout\nname "text:First"\n'
+                           'name "text:unknown"\nname "text:second"\ntext\n\\end_layout\n'
+                           '\\end_layout\n')
+        class text:
+            results = {'first': 'a\nb', 'second': 'c'}
+        args = {'template': './build/template.lyx', 'size': 'Default'}
+        first  = write_data_to_lyx('a\nb', 'Default')
+        second = write_data_to_lyx('c', 'Default')
+        # Verbatim blocks are generated as they are iterated over
+        filled_text = [line if isinstance(line, str) else ''.join(line) 
+                       for line in insert_text(args, text)]
+        self.assertEqual(filled_text, 
+                         ['name "text:first"\n', '\\end_layout\n', 'name "text:First"\n',
+                          'name "text:unknown"\n', 'name "text:second"\n', 'text\n', 
+                          '\\end_layout\n', second, first, '\\end_layout\n'])
+        
+        with open('./build/template.lyx', 'ab') as template:
+            template.write('x\nname "text:first"\n')
+        with self.assertRaises(IndexError):
+            insert_text(args, text)
+
+    def test_write_data_to_lyx(self):
+        data = '\n'.join('line %d' % n for n in range(25000))
+        lyx_code = write_data_to_lyx(data, 'tiny')
+        self.assertTrue(lyx_code.startswith('\\begin_layout Plain Layout\n\\begin_inset ERT'))
+        self.assertEqual(lyx_code.count('\\begin_layout Plain Layout\n'), 25000 + 4)
+        
+        with open('./build/verbatim.lyx', 'wb') as outfile:
+            self.assertIsNone(write_data_to_lyx(data, 'tiny', outfile))
+        with open('./build/verbatim.lyx', 'rb') as infile:
+            self.assertEqual(infile.read(), lyx_code)
+
+    def test_unchanged_output(self):
+        kwargs = {'input':    '../../gslab_fill/tests/input/legal.log', 
+                  'template': '../../gslab_fill/tests/input/textfill_template.lyx', 
+                  'output':   './build/textfill_template_filled.lyx'}
+        with nostderrout():
+            textfill(**kwargs)
+        os.utime(kwargs['output'], (0, 0))
+        with nostderrout():
+            message = textfill(**kwargs)
+        self.assertIn('filled successfully', message)
+        self.assertIn('unchanged', message)
+        self.assertEqual(os.path.getmtime(kwargs['output']), 0)
+        
+        with nostderrout():
+            message = textfill(size = 'tiny', **kwargs)
+        self.assertNotIn('unchanged', message)
+        self.assertNotEqual(os.path.getmtime(kwargs['output']), 0)
+
     def tearDown(self):
         if os.path.exists('./build/'):
             shutil.rmtree('./build/')
@@ -1,21 +1,23 @@
 #! /usr/bin/env python
 
 import os
-import argparse
 import types
 import traceback
 import textfill_info
+from _output import write_if_changed
 from HTMLParser import HTMLParser, HTMLParseError
 
+# Number of characters of each input file fed to text_parser at a time
+chunk_size = 1024 * 1024
+# Number of lines of a verbatim block generated at a time
+write_lines = 10000
+
 
 def textfill(**kwargs):
     try:
         args = parse_arguments(kwargs)
         text = parse_text(args)
-        insert_text(args, text)
-        exitmessage = args['template'] + ' filled successfully by textfill'
-        print exitmessage
-        return exitmessage	
+        return fill_text(args, text)
         
     except:
         print 'Error Found'
@@ -52,6 +54,17 @@ def parse_arguments(kwargs):
     return args
 
 
+def fill_text(args, text):
+    lyx_text = insert_text(args, text)
+    changed = write_to_lyx(args, lyx_text)
+    exitmessage = args['template'] + ' filled successfully by textfill'
+    if not changed:
+        exitmessage += ' (%s unchanged)' % args['output']
+    print exitmessage
+    
+    return exitmessage
+
+
 def parse_text(args):
     text = read_text(args['input'], args['prefix'])
     text = clean_text(text, args['remove_echoes'])
@@ -60,23 +73,28 @@ def parse_text(args):
 
 
 def read_text(input, prefix):
-    data = ''
     if isinstance(input, types.StringTypes):
         input = [input]
-    for file in input:
-        data += open(file, 'rU').read()
     text = text_parser(prefix)
-    text.feed(data)
+    for file in input:
+        with open(file, 'rU') as infile:
+            for chunk in iter(lambda: infile.read(chunk_size), ''):
+                text.feed(chunk)
     text.close()
     
     return text
 
 
 class text_parser(HTMLParser):
+    '''
+    Collect the data inside each tag starting with prefix into results, by the
+    tag name without the prefix. Data inside nested tags goes to the innermost.
+    '''
     def __init__(self, prefix):
         HTMLParser.__init__(self)
         self.recording = False
         self.results = {}
+        self.buffers = {}
         self.open = []
         self.closed = []
         self.prefix = prefix
@@ -86,24 +104,32 @@ class text_parser(HTMLParser):
             tag_name = tag.replace(self.prefix, '', 1)
             self.recording = True
             self.results[tag_name] = ''
+            self.buffers[tag_name] = []
             self.open.append(tag_name)
     
     def handle_data(self, data):
         if self.recording:
-            self.results[self.open[-1]]+=data
+            self.buffers[self.open[-1]].append(data)
     
     def handle_endtag(self, tag):
         if tag.startswith(self.prefix):
             tag_name = tag.replace(self.prefix, '', 1)
-            self.open.remove(tag_name)
+            if self.open and self.open[-1] == tag_name and tag_name not in self.open[:-1]:
+                self.open.pop()
+            else:
+                # Tags closed out of order lose their first open instance
+                self.open.remove(tag_name)
             self.closed.append(tag_name)
             if not self.open:
                 self.recording = False
     
     def close(self):
+        closed = set(self.closed)
         for tag in self.results.keys():
-            if tag not in self.closed:
+            if tag not in closed:
                 raise HTMLParseError('Tag %s is not closed' % tag)
+        for tag in self.results.keys():
+            self.results[tag] = ''.join(self.buffers[tag])
 
 
 def clean_text(text, remove_echoes):
@@ -128,42 +154,69 @@ def remove_trailing_leading_blanklines(list):
     return list
 
 
-def insert_text(args,text):
+def insert_text(args, text):
+    '''
+    Return the lines of the template with the LyX code of each tagged section of 
+    text inserted after the first layout closed after its label, as a verbatim_block.
+    Sections whose labels share a layout are inserted in reverse order of the labels.
+    '''
     lyx_text = open(args['template'], 'rU').readlines()
-    # Loop over (expanding) raw LyX text
-    n = 0
-    loop = True
-    while loop==True:
-        n+=1 
-        if n<len(lyx_text):
-            if (lyx_text[n].startswith('name "text:')):
-                tag = lyx_text[n].replace('name "text:','',1).rstrip('"\n').lower()
-                if tag in text.results:
-                    # Insert text after preceding layout is closed
-                    insert_now = False
-                    i = n
-                    while insert_now is False:
-                        i+=1
-                        if lyx_text[i]=='\\end_layout\n':
-                            insert_now = True
-                    
-                    # Insert text
-                    for key in text.results:
-                        if tag==key:
-                            lyx_code = write_data_to_lyx(text.results[key], args['size'])
-                    lyx_text.insert(i+1, lyx_code)
-        else:
-            loop = False
+    lyx_codes = {}
+    pending = []
+    filled_text = [lyx_text[0]] if lyx_text else []
+    for line in lyx_text[1:]:
+        filled_text.append(line)
+        if line.startswith('name "text:'):
+            tag = line.replace('name "text:', '', 1).rstrip('"\n').lower()
+            if tag in text.results:
+                if tag not in lyx_codes:
+                    lyx_codes[tag] = verbatim_block(text.results[tag], args['size'])
+                pending.append(lyx_codes[tag])
+        elif pending and line == '\\end_layout\n':
+            filled_text.extend(reversed(pending))
+            pending = []
     
-    outfile = open(args['output'], 'wb')
-    outfile.write( ''.join(lyx_text) )
-    outfile.close()
+    if pending:
+        raise IndexError('No layout is closed after a text label in %s' % args['template'])
     
-    return lyx_text
+    return filled_text
 
 
-def write_data_to_lyx(data, size):
-    data_list = data.split('\n')
+def write_to_lyx(args, lyx_text):
+    return write_if_changed(args['output'], lyx_text)
+
+
+def write_data_to_lyx(data, size, outfile = None):
+    '''
+    Return the LyX code of a verbatim block holding the lines of data, or write it
+    to the open file outfile, write_lines lines at a time, if one is given.
+    '''
+    if outfile is None:
+        return ''.join(verbatim_lines(data, size))
+    
+    outfile.writelines(verbatim_lines(data, size))
+
+
+class verbatim_block(object):
+    '''
+    The LyX code of a verbatim block holding the lines of data. Each iteration over
+    it generates the code afresh with verbatim_lines, so that the block is written 
+    to the output without ever being built as one string.
+    '''
+    
+    def __init__(self, data, size):
+        self.data = data
+        self.size = size
+    
+    def __iter__(self):
+        return verbatim_lines(self.data, self.size)
+
+
+def verbatim_lines(data, size):
+    '''
+    Generate the LyX code of a verbatim block holding the lines of data, 
+    write_lines lines at a time.
+    '''
     linewrap_beg = '\\begin_layout Plain Layout\n'
     linewrap_end = '\\end_layout\n'
     if size!='Default':
@@ -182,9 +235,9 @@ def write_data_to_lyx(data, size):
                 '\end_inset\n' \
                 '\end_layout'
     
-    lyx_code = preamble
-    for line in data_list:
-        lyx_code += linewrap_beg + line + linewrap_end
-    lyx_code += postamble
-    
-    return lyx_code
+    data_list = data.split('\n')
+    linewrap = linewrap_end + linewrap_beg
+    yield preamble
+    for start in range(0, len(data_list), write_lines):
+        yield linewrap_beg + linewrap.join(data_list[start:start + write_lines]) + linewrap_end
+    yield postamble
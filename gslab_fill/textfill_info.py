@@ -34,6 +34,8 @@ input = 'input_file_1 input_file_2'. The argument 'template' is the user written
 file which contains the labels which will be replaced with sections of the log files. 
 The argument 'output' is the name of the filled LyX file to be produced. Note that this 
 file is created by textfill.py, and should not be edited manually by the user.
+If the output file already exists with exactly the content textfill produces, it is 
+not rewritten, and the message textfill returns notes that the output is unchanged.
 
 There are two optional arguments: 'size' and 'remove_echoes'. The argument 'size' 
 determines the size of inserted text relative to body text in the output file. 
@@ -1,5 +1,14 @@
 import gslab_scons.misc as misc
-from gslab_fill import tablefill
+
+
+def tablefill(**kwargs):
+    '''
+    Call gslab_fill's tablefill. gslab_fill is imported on the first call rather
+    than with gslab_scons, as SConstructs import gslab_scons on every run of SCons,
+    including runs that build no tables.
+    '''
+    from gslab_fill.tablefill import tablefill as fill
+    return fill(**kwargs)
 
 
 def build_tables(target, source, env):
@@ -18,13 +27,23 @@ def build_tables(target, source, env):
         should be the LyX file specifying the table format. The subsequent 
         sources should be the text files containing the data with which the
         tables are to be filled. 
+
+    Note: if the construction environment sets TABLEFILL_CACHE, e.g. 
+    `env['TABLEFILL_CACHE'] = '.tablefill_cache'`, tablefill caches 
+    compiled templates in that directory.
     '''
     source = misc.make_list_if_string(source)
     target = misc.make_list_if_string(target)
     
     misc.check_code_extension(str(target[0]), 'lyx')
     
+    try:
+        cache = env['TABLEFILL_CACHE']
+    except (KeyError, TypeError):
+        cache = None
+    
     tablefill(input    = ' '.join([str(a) for a in source[1:len(source)]]), 
               template = str(source[0]), 
-              output   = str(target[0]))
+              output   = str(target[0]),
+              cache    = cache)
     return None